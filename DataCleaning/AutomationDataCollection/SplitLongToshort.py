@@ -1,31 +1,97 @@
-def split_text_into_chunks(text, num_chunks=3):
-    # Calculate the length of each chunk
-    chunk_size = len(text) // num_chunks
-    chunks = []
-
-    # Split the text into chunks
-    for i in range(num_chunks):
-        start_index = i * chunk_size
-        if i == num_chunks - 1:  # Last chunk takes the remainder of the text
-            end_index = len(text)
-        else:
-            end_index = (i + 1) * chunk_size
-        chunks.append(text[start_index:end_index])
-
-    return chunks
+import re
+
+DEFAULT_MAX_CHARS = 12000
+DEFAULT_OVERLAP = 200
+# Rough size of a token for English text and markup, so no tokenizer is needed in Zapier
+CHARS_PER_TOKEN = 4
+
+SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+def _cut_point(text, start, limit):
+    """Best place to end a chunk that starts at `start` and may not go past `limit`"""
+    if limit >= len(text):
+        return len(text)
+    # Do not accept a cut in the first half of the chunk, to keep chunks close to full size
+    floor = start + (limit - start) // 2
+
+    # 1. Just after the end of a tag
+    cut = text.rfind('>', floor, limit)
+    if cut != -1:
+        return cut + 1
+
+    # 2. Just after the end of a sentence
+    last = None
+    for last in SENTENCE_END.finditer(text, floor, limit):
+        pass
+    if last is not None:
+        cut = last.end()
+    else:
+        # 3. At whitespace, 4. anywhere
+        cut = max(text.rfind(' ', floor, limit), text.rfind('\n', floor, limit), text.rfind('\t', floor, limit))
+        cut = cut + 1 if cut != -1 else limit
+
+    # Never leave a tag open at the end of a chunk
+    tag_open = text.rfind('<', floor, cut)
+    if tag_open != -1 and text.rfind('>', tag_open, cut) == -1:
+        cut = tag_open
+    return cut
+
+def iter_chunks(text, max_chars=None, max_tokens=None, overlap=DEFAULT_OVERLAP):
+    """
+    Yield chunks of at most max_chars characters (or about max_tokens tokens).
+
+    Chunks end after a tag, else after a sentence, else at whitespace, and
+    each chunk repeats the last `overlap` characters of the previous one
+    (from a word start) so phone numbers and names on an edge are seen
+    whole in at least one chunk. One pass over the text.
+    """
+    if max_chars is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN if max_tokens else DEFAULT_MAX_CHARS
+    max_chars = max(int(max_chars), 2)
+    overlap = min(max(int(overlap), 0), max_chars // 2 - 1)
+
+    start = 0
+    while start < len(text):
+        end = _cut_point(text, start, start + max_chars)
+        if end <= start:
+            end = min(start + max_chars, len(text))
+        yield text[start:end]
+        if end >= len(text):
+            return
+        next_start = end - overlap
+        if overlap:
+            # Begin the overlap at a word instead of part way through one
+            space = text.find(' ', next_start, end)
+            if space != -1:
+                next_start = space + 1
+        start = max(next_start, start + 1)
+
+def _int_option(input_data, key):
+    value = input_data.get(key)
+    return int(value) if value not in (None, '') else None
 
 def main(input_data):
     input_text = input_data.get('text', '')
     if not input_text:
-        return {'chunk_1': '', 'chunk_2': '', 'chunk_3': ''}
-    
-    chunks = split_text_into_chunks(input_text)
-    return {f'chunk_{i + 1}': chunk for i, chunk in enumerate(chunks)}
+        return {'chunk_count': 0, 'chunk_1': ''}
+
+    overlap = _int_option(input_data, 'overlap')
+    chunks = iter_chunks(
+        input_text,
+        max_chars=_int_option(input_data, 'max_chars'),
+        max_tokens=_int_option(input_data, 'max_tokens'),
+        overlap=DEFAULT_OVERLAP if overlap is None else overlap,
+    )
+    output = {f'chunk_{i + 1}': chunk for i, chunk in enumerate(chunks)}
+    output['chunk_count'] = len(output)
+    return output
 
 # Example usage in Zapier
 if __name__ == "__main__":
     input_data = {
-        'text': 'Your long scraped HTML text goes here...'
+        'text': 'Your long scraped HTML text goes here...',
+        'max_tokens': '3000',
+        'overlap': '200',
     }
     result = main(input_data)
-    print(result)
\ No newline at end of file
+    print(result)
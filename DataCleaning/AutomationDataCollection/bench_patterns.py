@@ -0,0 +1,196 @@
+"""
+Worst-case benchmark and fuzzer for the contact patterns in step2.py.
+
+Times every compiled pattern on pathological inputs (long digit runs,
+separator ladders, unterminated e-mail local parts, label soups) at
+growing sizes and fails when a pattern grows faster than linearly or
+exceeds the per-document budget. A random fuzz pass then checks that
+extract_info always returns within its time budget.
+
+With --corpus, the text of a real crawl (any input extract_corpus.py
+accepts) is also scanned with and without the fax/title keyword
+prefilter, which must find exactly the same matches.
+
+    python bench_patterns.py
+    python bench_patterns.py --sizes 10000 100000 1000000 --fuzz 500
+    python bench_patterns.py --compare-original
+    python bench_patterns.py --corpus crawl/ --fuzz 0
+"""
+import re
+import sys
+import time
+import random
+import argparse
+
+import step2
+from crawl_archive import SegmentReader
+from extract_corpus import iter_tasks, read_task
+
+# The patterns as they were before the linear-time rewrite, for --compare-original
+ORIGINAL_PATTERNS = {
+    'email': re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", re.IGNORECASE),
+    'phone': re.compile(r"(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{1,4}\)?[-.\s]?)*\d{3,4}"),
+    'fax': re.compile(r"(?:Fax|F|传真|ファックス|팩스|फैक्स|тел|факс)[.:]?\s*(?:\+?\d{1,3}[-.\s]?)?"
+                      r"(?:\(?\d{1,4}\)?[-.\s]?)*\d{3,4}", re.IGNORECASE),
+    'address': re.compile(r"\d{1,5}\s+[A-Za-z0-9\s.,'-]+"),
+}
+
+# Pathological input generators: size -> text of roughly that many characters
+PATHOLOGICAL_INPUTS = {
+    'digit_run': lambda size: '7' * size,
+    'single_digits': lambda size: '1 ' * (size // 2),
+    'separator_ladder': lambda size: '12-(3). ' * (size // 8),
+    'short_groups': lambda size: '(1)2.3 ' * (size // 7),
+    'plus_runs': lambda size: '+1 ' * (size // 3),
+    'fax_soup': lambda size: 'Fax: f. F 1 факс 2 ' * (size // 19),
+    'email_local_part': lambda size: 'a.b_c%d+' * (size // 8),
+    'email_at_chain': lambda size: 'a@b.' * (size // 4),
+    'address_paragraph': lambda size: '12 Main Street, ' * (size // 16),
+    'capitalized_words': lambda size: 'Ab ' * (size // 3),
+}
+
+FUZZ_ALPHABET = '0123456789      ---...()++@@__%%,,\'FfaxXAaBbZz传真факс\n\t'
+
+
+def time_pattern(pattern, text):
+    """Seconds to run the pattern over the whole text, and the match count."""
+    start = time.perf_counter()
+    count = sum(1 for _ in pattern.finditer(text))
+    return time.perf_counter() - start, count
+
+
+def run_benchmark(sizes, max_seconds, max_growth, patterns):
+    """
+    Time every pattern on every pathological input at each size.
+
+    Returns:
+      A list of failure messages; empty when everything stayed linear and in budget.
+    """
+    failures = []
+    print(f"{'input':<20} {'pattern':<13} " + ' '.join(f"{size:>12,}" for size in sizes))
+    for input_name, generate in PATHOLOGICAL_INPUTS.items():
+        texts = [generate(size) for size in sizes]
+        for pattern_name, pattern in patterns.items():
+            timings = [time_pattern(pattern, text)[0] for text in texts]
+            print(f"{input_name:<20} {pattern_name:<13} " + ' '.join(f"{t * 1000:>10.1f}ms" for t in timings))
+            if timings[-1] > max_seconds:
+                failures.append(f"{pattern_name} on {input_name}: {timings[-1]:.2f}s at {sizes[-1]:,} chars")
+            for (small, t_small), (large, t_large) in zip(zip(sizes, timings), zip(sizes[1:], timings[1:])):
+                # Ignore timings too small to measure reliably
+                if t_large < 0.01:
+                    continue
+                growth = (t_large / max(t_small, 1e-4)) / (large / small)
+                if growth > max_growth:
+                    failures.append(f"{pattern_name} on {input_name}: super-linear growth "
+                                    f"({growth:.1f}x the size ratio from {small:,} to {large:,} chars)")
+    return failures
+
+
+def run_fuzz(iterations, size, seed):
+    """Random documents through extract_info; fail any that overrun the time budget."""
+    failures = []
+    rng = random.Random(seed)
+    slowest = 0.0
+    slack = 0.5
+    for i in range(iterations):
+        text = ''.join(rng.choice(FUZZ_ALPHABET) for _ in range(size))
+        start = time.perf_counter()
+        result = step2.extract_info(f"<html><body><p>{text}</p></body></html>")
+        elapsed = time.perf_counter() - start
+        slowest = max(slowest, elapsed)
+        if elapsed > step2.EXTRACTION_TIME_BUDGET + slack:
+            failures.append(f"fuzz case {i} (seed {seed}): extract_info took {elapsed:.2f}s")
+        if set(result) != {'emails', 'phones', 'fax', 'names', 'addresses', 'social_links'}:
+            failures.append(f"fuzz case {i} (seed {seed}): unexpected result keys {sorted(result)}")
+    print(f"Fuzzed {iterations} documents of {size:,} chars, slowest extract_info {slowest * 1000:.1f}ms")
+    return failures
+
+
+def _match_list(matches):
+    return [(match.span(), match.lastgroup) for match in matches]
+
+
+def run_corpus(path, repeat):
+    """
+    Time the contact and name scans of every page in a corpus with and without the keyword prefilters.
+
+    Returns:
+      A list of failure messages; empty when both scans found the same matches on every page.
+    """
+    failures = []
+    segments = SegmentReader()
+    try:
+        pages = [(task[1], read_task(task, segments)['html']) for task in iter_tasks(path)]
+    finally:
+        segments.close()
+    texts = [(source, step2.html_to_text(html)[0]) for source, html in pages if html]
+    triggered = sum(1 for _, text in texts if step2.compiled_patterns['trigger'].search(text)
+                    or step2.compiled_patterns['name_trigger'].search(text))
+    characters = sum(len(text) for _, text in texts)
+    print(f"Corpus: {len(texts):,} pages, {characters:,} characters of text, "
+          f"{triggered:,} with a fax label or title")
+
+    scans = {
+        'single scan': lambda text: [*step2.compiled_patterns['contact'].finditer(text),
+                                     *step2.compiled_patterns['name'].finditer(text)],
+        'prefiltered': lambda text: [*step2._iter_contacts(text), *step2._iter_names(text)],
+    }
+    timings = {}
+    for name, scan in scans.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _, text in texts:
+                for _ in scan(text):
+                    pass
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+        print(f"  {name:<12} {best * 1000:>10.1f}ms  {characters / best / 1e6:>7.1f}M chars/s")
+    print(f"  speedup      {timings['single scan'] / timings['prefiltered']:>10.2f}x")
+
+    for source, text in texts:
+        if _match_list(scans['single scan'](text)) != _match_list(scans['prefiltered'](text)):
+            failures.append(f"prefiltered scan differs from the single scan on {source}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worst-case timing and fuzzing for the step2.py patterns.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="Input sizes in characters, smallest first")
+    parser.add_argument('--max-seconds', type=float, default=step2.EXTRACTION_TIME_BUDGET,
+                        help="Fail when one pattern takes longer than this on the largest input")
+    parser.add_argument('--max-growth', type=float, default=3.0,
+                        help="Fail when time grows this many times faster than the input size")
+    parser.add_argument('--fuzz', type=int, default=200, help="Number of random documents to fuzz")
+    parser.add_argument('--fuzz-size', type=int, default=20000, help="Characters per fuzz document")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the fuzz pass")
+    parser.add_argument('--compare-original', action='store_true',
+                        help="Also time the original patterns (use small sizes, they are quadratic)")
+    parser.add_argument('--corpus', help="Crawl to time the keyword prefilter on (directory, tarball, "
+                                         ".jsonl or crawl archive)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed passes over the corpus (best is kept)")
+    args = parser.parse_args()
+
+    patterns = {name: step2.compiled_patterns[name]
+                for name in ('email', 'phone', 'fax', 'name', 'alt_name', 'address', 'contact', 'contact_plain',
+                             'trigger', 'name_plain', 'name_trigger')}
+    failures = run_benchmark(args.sizes, args.max_seconds, args.max_growth, patterns)
+    if args.compare_original:
+        print("\nOriginal patterns (not checked):")
+        run_benchmark(args.sizes, float('inf'), float('inf'), ORIGINAL_PATTERNS)
+    failures += run_fuzz(args.fuzz, args.fuzz_size, args.seed)
+    if args.corpus:
+        print()
+        failures += run_corpus(args.corpus, args.repeat)
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll patterns stayed linear and within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Crawl a clinic site best-first for its contact details.
+
+Emails, phones and fax numbers usually live on /contact, /about or /team
+pages rather than the home page. Starting from the given URL, same-site
+links are scored by how likely they are to lead to contact details
+(keywords in the anchor text and the path, in the same languages as the
+fax labels and titles in step2.py) and fetched highest score first,
+within a page, depth and time budget. The crawl stops early once every
+requested field has been found.
+
+    python contact_crawler.py https://example-clinic.com --max-pages 8 --want emails phones fax
+"""
+import re
+import sys
+import json
+import time
+import heapq
+import argparse
+from urllib.parse import urljoin, urldefrag, urlparse, unquote
+
+import requests
+
+from step1 import build_session
+from step2 import html_to_text, extract_from_text, empty_result
+from scrape_extract import fetch_html, FETCH_TIMEOUT
+
+MAX_PAGES = 8
+MAX_DEPTH = 2
+CRAWL_TIME_BUDGET = 30.0
+WANTED_FIELDS = ('emails', 'phones')
+
+# Keyword -> weight, matched lowercase against anchor text and URL path
+CONTACT_KEYWORDS = {
+    # Contact pages
+    'contact': 10, 'kontakt': 10, 'contacto': 10, 'contatto': 10, 'contatti': 10, 'contato': 10,
+    'contactez': 10, 'nous-contacter': 10, 'impressum': 10, 'mentions-legales': 8, 'imprint': 8,
+    '联系': 10, '聯絡': 10, '連絡': 10, 'お問い合わせ': 10, '問い合わせ': 10, '연락': 10, '문의': 10,
+    'संपर्क': 10, 'контакт': 10, 'связ': 8,
+    # Locations and opening hours
+    'location': 6, 'find-us': 6, 'directions': 5, 'hours': 4, 'standort': 6, 'anfahrt': 6,
+    'ubicacion': 6, 'acces': 5, 'адрес': 6, '地址': 6, 'アクセス': 6, '오시는': 6,
+    # About and team pages, where names and titles are
+    'about': 6, 'ueber-uns': 6, 'uber-uns': 6, 'über': 5, 'a-propos': 6, 'qui-sommes': 6,
+    'quienes-somos': 6, 'nosotros': 5, 'chi-siamo': 6, 'sobre': 5, '关于': 6, '会社概要': 6, '소개': 6,
+    'हमारे-बारे': 6, 'о-нас': 6, 'о нас': 6,
+    'team': 6, 'staff': 6, 'equipe': 6, 'équipe': 6, 'equipo': 6, 'mitarbeiter': 6, 'praxis': 4,
+    'doctors': 6, 'vets': 6, 'veterinar': 5, 'vétérinaire': 5, 'tierarzt': 5, '团队': 6, '医生': 5,
+    'スタッフ': 6, '팀': 5, 'टीम': 6, 'команда': 6, 'врач': 5,
+}
+
+# Links that never lead to contact details
+NEGATIVE_KEYWORDS = ('login', 'signin', 'cart', 'checkout', 'privacy', 'cookie', 'terms', 'wp-admin',
+                     'feed', 'tag/', 'category/', 'blog/', 'news/', 'shop/', 'product')
+
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.doc', '.docx',
+                      '.xls', '.xlsx', '.mp4', '.mp3', '.css', '.js', '.ico', '.xml')
+
+# Anchor with its text; the text is bounded so an unclosed <a> cannot swallow the page
+ANCHOR_PATTERN = re.compile(r"""<a\b[^<>]*?href=['"]?([^'" <>]+)[^<>]*>(.{0,300}?)</a>""", re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^<>]+>")
+
+
+def site_of(url):
+    try:
+        host = (urlparse(url).hostname or '').lower()
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def normalize_link(base_url, href):
+    """Absolute http(s) URL without its fragment, or None for links not worth following."""
+    try:
+        url, _ = urldefrag(urljoin(base_url, href.strip()))
+        parsed = urlparse(url)
+    except ValueError:
+        # Malformed links such as 'http://[broken/x'
+        return None
+    if parsed.scheme not in ('http', 'https') or parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+        return None
+    return url
+
+
+def score_link(url, anchor_text):
+    """Contact likelihood of a link; 0 or less means not worth fetching."""
+    path = unquote(urlparse(url).path).lower()
+    text = anchor_text.lower()
+    if any(keyword in path for keyword in NEGATIVE_KEYWORDS):
+        return 0
+    score = 0.0
+    for keyword, weight in CONTACT_KEYWORDS.items():
+        if keyword in text:
+            score += weight
+        if keyword in path:
+            score += weight * 0.8
+    # Short paths are site sections rather than deep articles
+    score -= path.count('/') * 0.5
+    return score
+
+
+def iter_links(base_url, html):
+    for match in ANCHOR_PATTERN.finditer(html):
+        url = normalize_link(base_url, match.group(1))
+        if url:
+            anchor_text = ' '.join(TAG_PATTERN.sub(' ', match.group(2)).split())
+            yield url, anchor_text
+
+
+def _merge(merged, data):
+    for field, values in data.items():
+        if field == 'social_links':
+            for platform, links in values.items():
+                known = merged['social_links'].setdefault(platform, [])
+                known.extend(link for link in links if link not in known)
+        else:
+            known = set(merged[field])
+            merged[field].extend(value for value in values if value not in known)
+
+
+def crawl_contacts(start_url, session=None, max_pages=MAX_PAGES, max_depth=MAX_DEPTH,
+                   time_budget=CRAWL_TIME_BUDGET, want=WANTED_FIELDS, timeout=FETCH_TIMEOUT):
+    """
+    Best-first crawl of one site for contact information.
+
+    Args:
+      start_url: The site's home page (or any page on it).
+      max_pages: Most pages to fetch, including the start page.
+      max_depth: Most links to follow away from the start page.
+      time_budget: Seconds for the whole crawl.
+      want: Result fields that must all be non-empty to stop early.
+
+    Returns:
+      A dict with url, data (step2's result shape, merged over all pages),
+      pages (url, depth, score, status and error of each fetch) and
+      stopped ('found', 'pages', 'time' or 'exhausted').
+    """
+    session = session or build_session()
+    deadline = time.monotonic() + time_budget
+    # The start page may redirect to another host (http://clinic.com -> https://www.clinic-vets.com);
+    # links on either host belong to the site
+    sites = {site_of(start_url)}
+    merged = empty_result()
+    pages = []
+    queue = [(0.0, 0, start_url, 0)]
+    seen = {start_url.rstrip('/')}
+    order = 1
+    stopped = 'exhausted'
+
+    while queue:
+        if len(pages) >= max_pages:
+            stopped = 'pages'
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0.5:
+            stopped = 'time'
+            break
+        negative_score, _, url, depth = heapq.heappop(queue)
+        page = {'url': url, 'depth': depth, 'score': 0.0 - negative_score, 'status': None}
+        pages.append(page)
+        try:
+            response, html, _ = fetch_html(session, url, timeout=min(timeout, remaining))
+            page['status'] = response.status_code
+            if len(pages) == 1:
+                sites.add(site_of(response.url))
+                seen.add(response.url.rstrip('/'))
+        except requests.exceptions.RequestException as e:
+            page['status'] = getattr(e.response, 'status_code', None)
+            page['error'] = str(e)
+            continue
+        except ValueError as e:
+            # A malformed start URL fails here rather than in requests
+            page['error'] = str(e)
+            continue
+
+        text, hrefs = html_to_text(html)
+        _merge(merged, extract_from_text(text, hrefs))
+        if want and all(merged.get(field) for field in want):
+            stopped = 'found'
+            break
+
+        if depth >= max_depth:
+            continue
+        for link, anchor_text in iter_links(response.url, html):
+            key = link.rstrip('/')
+            if key in seen or site_of(link) not in sites:
+                continue
+            seen.add(key)
+            score = score_link(link, anchor_text)
+            if score > 0:
+                heapq.heappush(queue, (-score, order, link, depth + 1))
+                order += 1
+
+    return {'url': start_url, 'data': merged, 'pages': pages, 'stopped': stopped}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl sites best-first for contact information.")
+    parser.add_argument('urls', nargs='+', help="Start URLs, one site each")
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help="Pages to fetch per site")
+    parser.add_argument('--max-depth', type=int, default=MAX_DEPTH, help="Links to follow from the start page")
+    parser.add_argument('--time-budget', type=float, default=CRAWL_TIME_BUDGET, help="Seconds per site")
+    parser.add_argument('--want', nargs='*', default=list(WANTED_FIELDS),
+                        help="Fields that stop the crawl once all are found (emails phones fax names addresses)")
+    args = parser.parse_args()
+
+    session = build_session()
+    for url in args.urls:
+        result = crawl_contacts(url, session, args.max_pages, args.max_depth, args.time_budget, args.want)
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+if 'input_data' in globals():
+    # Zapier code step (bundle step1/step2/scrape_extract as described in scrape_extract.py)
+    output = crawl_contacts(
+        input_data.get('url', '').strip(),
+        max_pages=int(input_data.get('max_pages') or MAX_PAGES),
+        time_budget=float(input_data.get('time_budget') or CRAWL_TIME_BUDGET),
+    )
+elif __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Compressed crawl archive for re-extracting pages without fetching them again.
+
+Fetched pages are appended to segment files (segment-00001.warc.gz, ...)
+in WARC style: every record is its own gzip member holding a WARC
+response header and a minimal HTTP response. Segments roll over at
+SEGMENT_BYTES. An SQLite index next to the segments maps URL and fetch
+time to (segment, offset, length), so one record can be read from a
+memory-mapped segment by decompressing only its own member.
+
+    step1.py --batch urls.csv --output pages.jsonl --archive crawl/
+    extract_corpus.py crawl/ --since 2026-09-01 --latest
+"""
+import os
+import mmap
+import zlib
+import uuid
+import gzip
+import time
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+SEGMENT_BYTES = 1024 * 1024 * 1024
+INDEX_NAME = 'index.sqlite3'
+SEGMENT_PATTERN = 'segment-{:05d}.warc.gz'
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_time(value):
+    """Epoch seconds from a timestamp, an ISO date or an ISO date-time (UTC if no zone)."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def encode_record(url, status, html, fetched_at):
+    """One gzip member holding a WARC response record."""
+    body = html.encode('utf-8')
+    http_block = (
+        f"HTTP/1.1 {status or 0}\r\n"
+        f"Content-Type: text/html; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode('utf-8') + body
+    header = (
+        "WARC/1.0\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"WARC-Date: {_iso(fetched_at)}\r\n"
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(http_block)}\r\n\r\n"
+    ).encode('utf-8')
+    return gzip.compress(header + http_block + b"\r\n\r\n", compresslevel=6)
+
+
+def decode_record(member):
+    """Parse one gzip member back into a dict with url, date, status and html."""
+    data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(member)
+    warc_header, _, rest = data.partition(b"\r\n\r\n")
+    fields = dict(line.split(': ', 1) for line in warc_header.decode('utf-8').split('\r\n')[1:] if ': ' in line)
+    http_block = rest[:int(fields.get('Content-Length', len(rest)))]
+    http_header, _, body = http_block.partition(b"\r\n\r\n")
+    status_line = http_header.split(b"\r\n", 1)[0].decode('latin-1')
+    status = int(status_line.split()[1]) if len(status_line.split()) > 1 else None
+    return {
+        'url': fields.get('WARC-Target-URI'),
+        'date': fields.get('WARC-Date'),
+        'status': status or None,
+        'html': body.decode('utf-8', errors='replace'),
+    }
+
+
+def scan_segment(path):
+    """(offset, length) of every gzip member in a segment, for segments without an index."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offset = 0
+        while offset < len(data):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            position = offset
+            while not decompressor.eof and position < len(data):
+                block = data[position:position + 65536]
+                decompressor.decompress(block)
+                position += len(block)
+            length = (position - offset) - len(decompressor.unused_data)
+            if length <= 0 or not decompressor.eof:
+                return
+            yield offset, length
+            offset += length
+
+
+class CrawlArchive:
+    """Append-only segment files plus their SQLite offset index, in one directory."""
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(directory, INDEX_NAME), timeout=60,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS records (
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                status INTEGER
+            )"""
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_url_time ON records (url, fetched_at)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS records_time ON records (fetched_at)")
+        self.connection.commit()
+        self._segment_file = None
+        self._segment_name = None
+
+    def _current_segment(self, incoming):
+        if self._segment_file is not None:
+            size = self._segment_file.tell()
+            if size == 0 or size + incoming <= self.segment_bytes:
+                return self._segment_file
+        if self._segment_file is not None:
+            self._segment_file.close()
+        existing = sorted(name for name in os.listdir(self.directory) if name.startswith('segment-'))
+        number = int(existing[-1][len('segment-'):].split('.')[0]) if existing else 0
+        name = existing[-1] if existing else SEGMENT_PATTERN.format(1)
+        path = os.path.join(self.directory, name)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size and size + incoming > self.segment_bytes:
+            name = SEGMENT_PATTERN.format(number + 1)
+        self._segment_name = name
+        self._segment_file = open(os.path.join(self.directory, name), 'ab')
+        return self._segment_file
+
+    def append(self, url, status, html, fetched_at=None):
+        """Write one fetched page and index it."""
+        fetched_at = fetched_at or time.time()
+        member = encode_record(url, status, html, fetched_at)
+        with self.lock:
+            segment = self._current_segment(len(member))
+            offset = segment.tell()
+            segment.write(member)
+            segment.flush()
+            self.connection.execute(
+                "INSERT INTO records (url, fetched_at, segment, offset, length, status) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, fetched_at, self._segment_name, offset, len(member), status),
+            )
+            self.connection.commit()
+
+    def records(self, since=None, until=None, latest_only=False):
+        """
+        Index entries as (url, fetched_at, segment path, offset, length), in segment order.
+
+        Args:
+          since, until: Fetch time bounds (epoch seconds or ISO dates).
+          latest_only: Keep only the newest fetch of each URL within the bounds.
+        """
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("fetched_at >= ?")
+            params.append(parse_time(since))
+        if until is not None:
+            conditions.append("fetched_at < ?")
+            params.append(parse_time(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        if latest_only:
+            query = (f"SELECT url, MAX(fetched_at), segment, offset, length FROM records {where} "
+                     f"GROUP BY url ORDER BY segment, offset")
+        else:
+            query = f"SELECT url, fetched_at, segment, offset, length FROM records {where} ORDER BY segment, offset"
+        for url, fetched_at, segment, offset, length in self.connection.execute(query, params):
+            yield url, fetched_at, os.path.join(self.directory, segment), offset, length
+
+    def lookup(self, url, at=None):
+        """Newest record of a URL fetched at or before `at` (default: now), or None."""
+        row = self.connection.execute(
+            "SELECT segment, offset, length FROM records WHERE url = ? AND fetched_at <= ? "
+            "ORDER BY fetched_at DESC LIMIT 1",
+            (url, parse_time(at) if at is not None else float('inf')),
+        ).fetchone()
+        if row is None:
+            return None
+        return read_record(os.path.join(self.directory, row[0]), row[1], row[2])
+
+    def close(self):
+        with self.lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+            self.connection.close()
+
+
+class SegmentReader:
+    """Memory-mapped segments, opened on first use and kept open."""
+
+    def __init__(self):
+        self.maps = {}
+
+    def read(self, path, offset, length):
+        data = self.maps.get(path)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[path] = data
+        return decode_record(data[offset:offset + length])
+
+    def close(self):
+        for data in self.maps.values():
+            data.close()
+        self.maps = {}
+
+
+def read_record(path, offset, length):
+    reader = SegmentReader()
+    try:
+        return reader.read(path, offset, length)
+    finally:
+        reader.close()
+
+
+def is_archive(path):
+    return (os.path.isdir(path) and os.path.exists(os.path.join(path, INDEX_NAME))) or \
+        (os.path.isfile(path) and path.lower().endswith('.warc.gz'))
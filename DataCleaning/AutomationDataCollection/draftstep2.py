@@ -1,25 +1,59 @@
 import re  # Using the standard 're' module
 import json
+import time
+import codecs
+from html.parser import HTMLParser
+
+# Per-document budgets so one pathological page cannot stall a Zap
+EXTRACTION_TIME_BUDGET = 2.0   # seconds of matching per document
+MAX_MATCHES_PER_PATTERN = 500  # matches kept per pattern per document
+
+# Streaming extraction (extract_info_stream) holds about this much text at a time
+STREAM_WINDOW_CHARS = 65536
+STREAM_OVERLAP_CHARS = 512     # at least an e-mail domain after its '@' (see _email_at)
+STREAM_CONTEXT_CHARS = 80      # kept before a window for lookbehinds and e-mail local parts
+
+# Phone body shared by 'phone' and 'fax'. Every digit group must end in a
+# separator (or be a bracketed area code) and there are at most five of
+# them, so there is a single way to split a digit run and matching stays
+# linear. The last block takes up to 12 digits so numbers written without
+# separators ("5551234567", "+44 2079460958") still match; the lookarounds
+# stop matches starting or ending inside a longer run of digits such as a
+# tracking ID.
+PHONE_BODY = r"(?:\+\d{1,3}[-.\s]?)?(?:\(\d{1,4}\)[-.\s]?|\d{1,4}[-.\s]){0,5}\d{3,12}(?!\d)"
+
+# Fax labels. The Latin and Cyrillic words match in any case and must stand
+# alone so the 'f' in "of 555 1234" is not a fax label; the others need not.
+FAX_WORDS = ('Fax', 'F', 'тел', 'факс')
+FAX_SCRIPT_LABELS = ('传真', 'ファックス', '팩스', 'फैक्स')
+# Every character that (?i:...) matches for the first letter of a FAX_WORDS entry
+FAX_WORD_INITIALS = {'f': 'Ff', 'т': 'Ттᲄᲅ', 'ф': 'Фф'}
+
+# Titles that may lead a name, tried in this order
+NAME_TITLES = ('Dr', 'Mr', 'Mrs', 'Ms', 'Miss', 'Professor', 'Prof', 'MD', 'DVM', 'Docteur', 'Vétérinaire', 'Asv',
+               'सर्व', 'श्री', 'श्रीमती', 'Herr', 'Frau', 'M.', 'Mme', 'Mlle', 'Señor', 'Señora', 'Señorita',
+               '先生', '女士', '教授', '博士', '선생님', '교수님', 'Др', 'Г-н', 'Г-жа', 'Господин', 'Госпожа', 'Проф')
+
+FAX_LABEL = r"(?:(?<![^\W\d_])(?i:" + '|'.join(FAX_WORDS) + r")(?![^\W\d_])|" + '|'.join(FAX_SCRIPT_LABELS) + ")"
+NAME_TITLE = "(?:" + '|'.join(re.escape(title) for title in NAME_TITLES) + ")"
 
 # Enhanced regex patterns compatible with 're' module
 patterns = {
-    'email': r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}",
+    'email': r"(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9.-]{1,253}\.[a-zA-Z]{2,24}",
 
-    'phone': r"(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{1,4}\)?[-.\s]?)*\d{3,4}",
+    'phone': r"(?<![\d+])" + PHONE_BODY,
 
-    'fax': r"(?:Fax|F|传真|ファックス|팩스|फैक्स|тел|факс)[.:]?\s*(?:\+?\d{1,3}[-.\s]?)?(?:\(?\d{1,4}\)?[-.\s]?)*\d{3,4}",
+    'fax': FAX_LABEL + r"[.:]?\s{0,3}" + PHONE_BODY,
 
-    'name': r"""
-        (?:(?:Dr|Mr|Mrs|Ms|Miss|Professor|Prof|MD|DVM|Docteur|Vétérinaire|Asv|
-        सर्व|श्री|श्रीमती|Herr|Frau|M\.|Mme|Mlle|Señor|Señora|Señorita|先生|女士|教授|博士|선생님|교수님|
-        Др|Г-н|Г-жа|Господин|Госпожа|Проф)\.?\s+)?
+    'name': r"(?:" + NAME_TITLE + r"\.?\s+)?" + r"""
         (?:[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+)
     """,
 
     'alt_name': r"(?:[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})",
 
+    # A house number followed by at most nine words, instead of the rest of the paragraph
     'address': r"""
-        \d{1,5}\s+[A-Za-z0-9\s.,'-]+
+        (?<!\d)\d{1,5}\s+[A-Za-z0-9.'-]{1,40}(?:[\s,]{1,3}[A-Za-z0-9.'-]{1,40}){1,8}
     """,
 
     'address_fallback': r"[A-Za-z0-9\s.,'-]+",
@@ -33,6 +67,79 @@ patterns = {
     }
 }
 
+# E-mails, fax and phone numbers in one alternation, so one scan finds all
+# three. Their matches never overlap another kind's: e-mails are found at
+# their '@' and read around it (see _email_at), and a fax number is the
+# phone number after a fax label, so it is also kept as a phone. At a
+# given position fax labels are tried before bare phones, and a phone must
+# hold at least seven digits, as shorter matches are discarded anyway.
+# The leading lookahead rejects every other position in one cheap step; it
+# lists the first characters of numbers and fax labels and must grow with
+# those lists. Addresses and names can overlap numbers and each other, so
+# each has its own scan (see SCANS).
+CANDIDATE_START = r"[\d+(@FfТтᲄᲅФф传フ팩फ]"
+
+patterns['contact'] = r"(?=" + CANDIDATE_START + r""")(?:
+      (?P<email>@)
+    | (?P<fax>""" + patterns['fax'] + r""")
+    | (?P<phone>(?<![\d+])(?=(?:[-+().\s]{0,3}\d){7})""" + PHONE_BODY + r""")
+)"""
+
+# Most pages have no fax label and no title, so the text is scanned with
+# 'contact_plain' (the same alternation without fax labels, behind a
+# narrower gate) and 'contact' is only tried where 'trigger' finds a fax
+# label before a number; names are scanned the same way with 'name_plain'
+# (no title) and 'name' where 'name_trigger' finds a title before a
+# capitalized word. Those are the only places where the two can match
+# differently, so the matches are the same as a scan with 'contact' or
+# 'name' alone (see _iter_prefiltered).
+patterns['contact_plain'] = r"""(?=[\d+(@])(?:
+      (?P<email>@)
+    | (?P<phone>(?<![\d+])(?=(?:[-+().\s]{0,3}\d){7})""" + PHONE_BODY + r""")
+)"""
+
+patterns['name_plain'] = r"[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+"
+
+def _trigger_pattern(entries):
+    """
+    One alternation of (word, alone, case-insensitive initials, tail)
+    entries, grouped by first character. Every branch starts with a
+    literal character, so the regex engine skips ahead to those
+    characters instead of trying each position; the 'stand alone'
+    lookbehind comes after that character for the same reason, and the
+    tails are lookaheads so a trigger never hides the next one.
+    """
+    groups = {}
+    for word, alone, initials, tail in entries:
+        rest = "(?i:" + word[1:] + ")" if initials else re.escape(word[1:])
+        for initial in initials or word[0]:
+            groups.setdefault((initial, alone), []).append(rest + (r"(?![^\W\d_])" if alone else "") + tail)
+    branches = []
+    for (initial, alone), tails in groups.items():
+        lookbehind = r"(?<![^\W\d_].)" if alone else ""
+        branches.append(initial + lookbehind + "(?:" + '|'.join(tails) + ")")
+    return '|'.join(branches)
+
+# Fax labels before a number
+patterns['trigger'] = _trigger_pattern(
+    [(word, True, FAX_WORD_INITIALS[word[0].lower()], r"(?=[.:]?\s{0,3}[\d+(])") for word in FAX_WORDS] +
+    [(label, False, None, r"(?=[.:]?\s{0,3}[\d+(])") for label in FAX_SCRIPT_LABELS]
+)
+# Titles before a capital; 'name' has no word boundary before its title, so neither has this
+patterns['name_trigger'] = _trigger_pattern(
+    [(title, False, None, r"(?=\.?\s+[A-Z])") for title in NAME_TITLES]
+)
+
+# All social platforms in one alternation, checked once per href
+patterns['social_link'] = '|'.join(
+    f"(?P<{platform}>{pattern})" for platform, pattern in patterns['social_links'].items()
+)
+
+# Style and script blocks (an unclosed one runs to the end, as in a browser) or any other tag
+patterns['markup'] = r"<(style|script)\b[^<>]*>.*?(?:</\1\s*>|\Z)|<[^<>]+>"
+
+patterns['href'] = r"""href=['"]?([^'" >]+)"""
+
 # Compile patterns with appropriate flags
 compiled_patterns = {
     'email': re.compile(patterns['email'], re.IGNORECASE),
@@ -45,7 +152,15 @@ compiled_patterns = {
     'social_links': {
         platform: re.compile(pattern, re.IGNORECASE)
         for platform, pattern in patterns['social_links'].items()
-    }
+    },
+    'contact': re.compile(patterns['contact'], re.VERBOSE),
+    'contact_plain': re.compile(patterns['contact_plain'], re.VERBOSE),
+    'trigger': re.compile(patterns['trigger']),
+    'name_plain': re.compile(patterns['name_plain']),
+    'name_trigger': re.compile(patterns['name_trigger']),
+    'social_link': re.compile(patterns['social_link'], re.IGNORECASE),
+    'markup': re.compile(patterns['markup'], re.IGNORECASE | re.DOTALL),
+    'href': re.compile(patterns['href'], re.IGNORECASE),
 }
 
 def clean_phone(phone):
@@ -75,109 +190,337 @@ def is_likely_name(name):
         all(word[0].isupper() for word in words if word)
     )
 
-def extract_info(html):
-    """Extract all contact information from HTML"""
+# Result shape shared by every extraction path
+def empty_result():
+    return {
+        'emails': [],
+        'phones': [],
+        'fax': [],
+        'names': [],
+        'addresses': [],
+        'social_links': {}
+    }
+
+def _email_at(text, at):
+    """The e-mail address around the '@' at position `at`, or None"""
+    for match in compiled_patterns['email'].finditer(text, max(0, at - 64), at + 280):
+        if match.start() < at < match.end():
+            return match.group()
+        if match.start() > at:
+            break
+    return None
+
+def html_to_text(html):
+    """Strip style, script and tags in one pass and return (text, hrefs)"""
+    hrefs = []
+    href_pattern = compiled_patterns['href']
+
+    def replace_markup(match):
+        tag = match.group()
+        if 'href' in tag.lower():
+            hrefs.extend(href_pattern.findall(tag))
+        return ' '
+
+    text = compiled_patterns['markup'].sub(replace_markup, html)
+    return ' '.join(text.split()), hrefs
+
+def _iter_prefiltered(text, start, full, plain, trigger):
+    """
+    The matches of `full` in text[start:], found with a keyword prefilter:
+    one scan for `trigger` positions, a scan with `plain` between them and
+    `full` anchored at each of them.
+    """
+    triggers = [match.start() for match in trigger.finditer(text, start)]
+    if not triggers:
+        yield from plain.finditer(text, start)
+        return
+    position = start
+    index = 0
+    pending = None
+    while True:
+        while index < len(triggers) and triggers[index] < position:
+            index += 1
+        if pending is None or pending.start() < position:
+            pending = plain.search(text, position)
+        trigger_at = triggers[index] if index < len(triggers) else None
+        if trigger_at is not None and (pending is None or trigger_at <= pending.start()):
+            # The leftmost match can only differ from the plain one at a trigger
+            match = full.match(text, trigger_at)
+            if match is None:
+                index += 1
+                continue
+        elif pending is not None:
+            match = pending
+        else:
+            return
+        yield match
+        position = match.end()
+
+def _iter_contacts(text, start=0):
+    """The matches of the 'contact' pattern in text[start:], prefiltered on fax labels"""
+    return _iter_prefiltered(text, start, compiled_patterns['contact'], compiled_patterns['contact_plain'],
+                             compiled_patterns['trigger'])
+
+def _iter_names(text, start=0):
+    """The matches of the 'name' pattern in text[start:], prefiltered on titles"""
+    return _iter_prefiltered(text, start, compiled_patterns['name'], compiled_patterns['name_plain'],
+                             compiled_patterns['name_trigger'])
+
+# Scans run over each text as (name, finder, kind). Each one finds the same
+# matches as its own pattern run alone, so overlapping fields (an address
+# running into a phone number, a name inside an address) are all kept; a
+# kind of None means the match's group name is the kind.
+SCANS = (
+    ('contact', _iter_contacts, None),
+    ('address', lambda text, start=0: compiled_patterns['address'].finditer(text, start), 'address'),
+    ('name', _iter_names, 'name'),
+    ('alt_name', lambda text, start=0: compiled_patterns['alt_name'].finditer(text, start), 'name'),
+)
+SCAN_KINDS = {
+    'contact': ('email', 'fax', 'phone'),
+    'address': ('address',),
+    'name': ('name',),
+    'alt_name': ('name',),
+}
+
+def _new_found():
+    return {'email': {}, 'fax': {}, 'phone': {}, 'address': {}, 'name': {}}
+
+def _collect(text, found, deadline, max_matches, starts=None, cut=None, status=None):
+    """
+    Add the contact fields in text to `found` (dicts used as ordered sets).
+
+    Every scan in SCANS starts at its own position in `starts` (0 when
+    missing). With `cut`, only matches that start before it and end before
+    the end of the text are kept; the rest belong to the next window.
+    Returns the position each scan has to resume from in the next window
+    so nothing is lost. When the time or match budget cuts a scan short,
+    status['truncated'] is set (if a `status` dict is given).
+    """
+    full = {kind for kind, values in found.items() if len(values) >= max_matches}
+    resume = {}
+    for scan, finder, scan_kind in SCANS:
+        carry_from = cut
+        if all(kind in full for kind in SCAN_KINDS[scan]):
+            if status is not None:
+                status['truncated'] = True
+            resume[scan] = carry_from
+            continue
+        for count, match in enumerate(finder(text, (starts or {}).get(scan, 0))):
+            if count % 64 == 0 and time.monotonic() > deadline:
+                if status is not None:
+                    status['truncated'] = True
+                break
+            kind = scan_kind or match.lastgroup
+            if cut is not None:
+                if match.start() >= cut:
+                    break
+                if match.end() >= len(text) and kind != 'email':
+                    # May continue past the window edge; read it again in the next window
+                    carry_from = match.start()
+                    break
+                # Resume after this match, as a single scan of the whole text would
+                carry_from = max(carry_from, match.end())
+            if kind not in full and len(found[kind]) >= max_matches:
+                full.add(kind)
+            if kind in full:
+                if status is not None:
+                    status['truncated'] = True
+                if all(kind in full for kind in SCAN_KINDS[scan]):
+                    break
+                continue
+            if kind == 'email':
+                value = _email_at(text, match.start())
+            elif kind in ('phone', 'fax'):
+                value = clean_phone(match.group(kind))
+                if value and kind == 'fax':
+                    # A fax number is also a phone number, as with the separate phone pattern
+                    found['phone'][value] = None
+            else:
+                value = match.group().strip()
+                if kind == 'name' and not is_likely_name(value):
+                    continue
+                if kind == 'address' and len(value.split()) <= 2:
+                    continue
+            if value:
+                found[kind][value] = None
+        resume[scan] = carry_from
+    return resume
+
+def _add_social_link(social_links, href):
+    match = compiled_patterns['social_link'].search(href)
+    if match:
+        social_links.setdefault(match.lastgroup, {})[href] = None
+
+def _result(found, social_links):
+    return {
+        'emails': list(found['email']),
+        'phones': list(found['phone']),
+        'fax': list(found['fax']),
+        'names': list(found['name']),
+        'addresses': list(found['address']),
+        'social_links': {platform: list(links) for platform, links in social_links.items()}
+    }
+
+def extract_from_text(text, hrefs=(), time_budget=EXTRACTION_TIME_BUDGET, max_matches=MAX_MATCHES_PER_PATTERN,
+                      status=None):
+    """
+    Extract all contact information from plain text, one scan per group of fields (see SCANS).
+
+    Pass a dict as `status` to learn whether the result is complete:
+    status['truncated'] is True when the time or match budget was reached.
+    """
+    if status is not None:
+        status['truncated'] = False
+    found = _new_found()
+    _collect(text, found, time.monotonic() + time_budget, max_matches, status=status)
+
+    # Extract social media links
+    social_links = {}
+    for href in hrefs:
+        _add_social_link(social_links, href)
+    return _result(found, social_links)
+
+def extract_info(html, time_budget=EXTRACTION_TIME_BUDGET, max_matches=MAX_MATCHES_PER_PATTERN, status=None):
+    """
+    Extract all contact information from HTML within a time and match budget.
+
+    With a `status` dict, status['truncated'] tells whether a budget cut the
+    extraction short and status['error'] holds the error, if any.
+    """
     try:
-        # Remove style and script contents
-        html_no_style = re.sub(r'<style[^>]*>[\s\S]*?</style>', '', html, flags=re.IGNORECASE)
-        html_no_script = re.sub(r'<script[^>]*>[\s\S]*?</script>', '', html_no_style, flags=re.IGNORECASE)
-
-        # Convert HTML to text
-        text_content = re.sub(r'<[^>]+>', ' ', html_no_script, flags=re.IGNORECASE)
-        text_content = re.sub(r'\s+', ' ', text_content, flags=re.IGNORECASE).strip()
-
-        # Extract emails
-        emails = list(set(compiled_patterns['email'].findall(text_content)))
-
-        # Extract and clean phone numbers
-        phones = []
-        phone_matches = compiled_patterns['phone'].findall(text_content)
-        for phone in phone_matches:
-            cleaned = clean_phone(phone)
-            if cleaned and cleaned not in phones:
-                phones.append(cleaned)
-
-        # Extract and clean fax numbers
-        fax_numbers = []
-        fax_contexts = compiled_patterns['fax'].finditer(text_content)
-        for match in fax_contexts:
-            fax = clean_phone(match.group())
-            if fax and fax not in fax_numbers:
-                fax_numbers.append(fax)
-
-        # Extract names
-        names = set()
-        titled_names = compiled_patterns['name'].findall(text_content)
-        names.update(name.strip() for name in titled_names if is_likely_name(name.strip()))
-
-        potential_names = compiled_patterns['alt_name'].findall(text_content)
-        names.update(name.strip() for name in potential_names if is_likely_name(name.strip()))
-
-        # Extract addresses using primary pattern
-        addresses = list(set(compiled_patterns['address'].findall(text_content)))
-
-        # Filter out irrelevant addresses
-        addresses = [addr.strip() for addr in addresses if len(addr.strip().split()) > 2]
-
-        # Extract all href attributes
-        href_pattern = re.compile(r'href=[\'"]?([^\'" >]+)', re.IGNORECASE)
-        hrefs = href_pattern.findall(html)
-
-        # Extract social media links
-        social_links = {}
-        for platform, pattern in compiled_patterns['social_links'].items():
-            matches = [href for href in hrefs if pattern.search(href)]
-            if matches:
-                social_links[platform] = list(set(matches))
-
-        return {
-            'emails': emails,
-            'phones': phones,
-            'fax': fax_numbers,
-            'names': list(names),
-            'addresses': addresses,
-            'social_links': social_links
-        }
+        text_content, hrefs = html_to_text(html)
+        return extract_from_text(text_content, hrefs, time_budget, max_matches, status)
+    except Exception as e:
+        print(f"Error in extraction: {str(e)}")
+        if status is not None:
+            status['error'] = str(e)
+        return empty_result()
+
+class _StreamingText(HTMLParser):
+    """Incremental HTML to text: buffers text outside style and script, keeps social hrefs"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces = []
+        self.size = 0
+        self.skip = 0
+        self.social_links = {}
+
+    def _add(self, text):
+        self.pieces.append(text)
+        self.size += len(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('style', 'script'):
+            self.skip += 1
+        self.handle_startendtag(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        for name, value in attrs:
+            if name == 'href' and value:
+                _add_social_link(self.social_links, value)
+        self._add(' ')
+
+    def handle_endtag(self, tag):
+        if tag in ('style', 'script') and self.skip:
+            self.skip -= 1
+        self._add(' ')
 
+    def handle_data(self, data):
+        if not self.skip:
+            self._add(data)
+
+    def take_text(self):
+        """Whitespace-normalized text buffered since the last call"""
+        raw = ''.join(self.pieces)
+        self.pieces = []
+        self.size = 0
+        text = ' '.join(raw.split())
+        if text and raw[0].isspace():
+            text = ' ' + text
+        if text and raw[-1].isspace():
+            text += ' '
+        return text
+
+def extract_info_stream(pieces, time_budget=EXTRACTION_TIME_BUDGET, max_matches=MAX_MATCHES_PER_PATTERN,
+                        window=STREAM_WINDOW_CHARS, overlap=STREAM_OVERLAP_CHARS):
+    """
+    Extract contact information from HTML read incrementally.
+
+    `pieces` is any iterable of str or bytes (UTF-8) blocks, e.g. a file
+    read in blocks or response.iter_content(). Text is scanned in windows
+    of about `window` characters; each window keeps the last `overlap`
+    characters of the previous one, so memory per page stays bounded
+    while a match across a window edge is still read whole.
+    """
+    deadline = time.monotonic() + time_budget
+    overlap = max(overlap, STREAM_OVERLAP_CHARS)
+    window = max(window, 2 * overlap)
+    parser = _StreamingText()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    found = _new_found()
+    state = {'tail': '', 'starts': {}}
+
+    def scan(final):
+        text = parser.take_text()
+        if state['tail'].endswith(' ') and text.startswith(' '):
+            text = text[1:]
+        text = state['tail'] + text
+        cut = None if final else len(text) - overlap
+        resume = _collect(text, found, deadline, max_matches, state['starts'], cut)
+        if not final:
+            # Keep text from the earliest resume point; each scan picks up where it left off
+            context_from = max(0, min(resume.values()) - STREAM_CONTEXT_CHARS)
+            state['tail'] = text[context_from:]
+            state['starts'] = {scan: position - context_from for scan, position in resume.items()}
+
+    try:
+        for piece in pieces:
+            if isinstance(piece, bytes):
+                piece = decoder.decode(piece)
+            parser.feed(piece)
+            if parser.size >= window:
+                scan(final=False)
+            if time.monotonic() > deadline:
+                break
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        scan(final=True)
+        return _result(found, parser.social_links)
     except Exception as e:
         print(f"Error in extraction: {str(e)}")
-        return {
-            'emails': [],
-            'phones': [],
-            'fax': [],
-            'names': [],
-            'addresses': [],
-            'social_links': {}
-        }
+        return empty_result()
 
-# Get HTML content from input_data provided by Zapier
-html_content = input_data.get('html', '')
+if 'input_data' in globals():
+    # Get HTML content from input_data provided by Zapier
+    html_content = input_data.get('html', '')
 
-# Process HTML and prepare output
-try:
-    if not html_content:
+    # Process HTML and prepare output
+    try:
+        if not html_content:
+            output = {
+                'success': False,
+                'error': 'No HTML content provided',
+                'data': None
+            }
+        else:
+            result = extract_info(html_content)
+            output = {
+                'success': True,
+                'error': None,
+                'data': result
+            }
+
+    except Exception as e:
         output = {
             'success': False,
-            'error': 'No HTML content provided',
+            'error': str(e),
             'data': None
         }
-    else:
-        result = extract_info(html_content)
-        output = {
-            'success': True,
-            'error': None,
-            'data': result
-        }
-
-except Exception as e:
-    output = {
-        'success': False,
-        'error': str(e),
-        'data': None
-    }
 
-# Print the final output with required ID
-print(json.dumps({
-    'output': output,
-    'id': '5fgunBIH5nfcaPgwiymwcjuT28AwOIJs'
-}))
\ No newline at end of file
+    # Print the final output with required ID
+    print(json.dumps({
+        'output': output,
+        'id': '5fgunBIH5nfcaPgwiymwcjuT28AwOIJs'
+    }))
@@ -0,0 +1,226 @@
+"""
+Run step2.extract_info over a whole crawl on every core.
+
+The input can be a directory of .html/.htm files, a tarball of them
+(.tar, .tar.gz, .tgz, .tar.bz2, .tar.xz), a JSONL file of
+{"url": ..., "html": ...} records such as the output of
+`step1.py --batch`, or a crawl archive written by `step1.py --archive`
+(the directory, or one .warc.gz segment). Archive records are read by
+the workers straight from the memory-mapped segments; --since, --until
+and --latest select them through the archive index. Pages are spread across a process pool in chunks and
+one JSONL record per page is written as soon as it is extracted:
+
+    {"source": ..., "url": ..., "data": {...}}    or    {"source": ..., "error": ...}
+
+With --cache, records also carry "cached": true/false. With --stream,
+files are read and extracted in blocks (extract_info_stream) so a huge
+page never sits in memory whole; it is slower per page.
+
+    python extract_corpus.py crawl/ --output contacts.jsonl
+    python extract_corpus.py pages.jsonl --workers 8 --chunksize 32 > contacts.jsonl
+"""
+import os
+import sys
+import json
+import time
+import tarfile
+import argparse
+import threading
+import multiprocessing
+
+from step2 import extract_info, extract_info_stream, EXTRACTION_TIME_BUDGET
+from extraction_cache import ExtractionCache
+from crawl_archive import CrawlArchive, SegmentReader, is_archive, scan_segment
+
+HTML_EXTENSIONS = ('.html', '.htm')
+STREAM_BLOCK_BYTES = 65536
+
+# Per-worker settings, filled in by the pool initializer
+_worker_options = {}
+
+
+def _init_worker(time_budget, cache_path=None, stream=False):
+    _worker_options['time_budget'] = time_budget
+    _worker_options['stream'] = stream
+    _worker_options['segments'] = SegmentReader()
+    _worker_options['cache'] = ExtractionCache(cache_path) if cache_path else None
+
+
+def _decode(data):
+    if isinstance(data, bytes):
+        return data.decode('utf-8', errors='replace')
+    return data
+
+
+def iter_directory(path):
+    """Tasks for every HTML file under a directory; workers read the files themselves."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(HTML_EXTENSIONS):
+                yield ('file', os.path.join(root, name))
+
+
+def iter_tarball(path):
+    """Tasks for every HTML member of a tarball, read sequentially so compressed archives stream."""
+    with tarfile.open(path, 'r:*') as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(HTML_EXTENSIONS):
+                yield ('html', member.name, archive.extractfile(member).read())
+
+
+def iter_jsonl(path):
+    """Tasks for every line of a JSONL file; workers parse the JSON."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                yield ('jsonl', f"{path}:{line_number}", line)
+
+
+def iter_archive(path, since=None, until=None, latest_only=False):
+    """Tasks pointing at archive records; workers read them from the segments."""
+    if os.path.isdir(path):
+        archive = CrawlArchive(path)
+        try:
+            for url, _, segment, offset, length in archive.records(since, until, latest_only):
+                yield ('warc', f"{os.path.basename(segment)}@{offset}", segment, offset, length)
+        finally:
+            archive.close()
+    else:
+        # A lone segment without its index: find the record boundaries by scanning it
+        for offset, length in scan_segment(path):
+            yield ('warc', f"{os.path.basename(path)}@{offset}", path, offset, length)
+
+
+def iter_tasks(path, since=None, until=None, latest_only=False):
+    if is_archive(path):
+        return iter_archive(path, since, until, latest_only)
+    if os.path.isdir(path):
+        return iter_directory(path)
+    if tarfile.is_tarfile(path):
+        return iter_tarball(path)
+    if path.lower().endswith(('.jsonl', '.ndjson')):
+        return iter_jsonl(path)
+    raise ValueError(f"Unsupported input (expected a directory, tarball or .jsonl file): {path}")
+
+
+def read_task(task, segments):
+    """The page of a task as a dict with its html, plus url and fetched_at when the input has them."""
+    kind, source = task[0], task[1]
+    if kind == 'file':
+        with open(source, 'rb') as f:
+            return {'html': _decode(f.read())}
+    if kind == 'warc':
+        item = segments.read(task[2], task[3], task[4])
+        return {'url': item['url'], 'fetched_at': item['date'], 'html': item['html']}
+    if kind == 'jsonl':
+        item = json.loads(task[2])
+        return {'url': item.get('url'), 'html': item.get('html') or ''}
+    return {'html': _decode(task[2])}
+
+
+def extract_task(task):
+    """Worker: turn one task into one output record."""
+    kind, source = task[0], task[1]
+    record = {'source': source}
+    try:
+        time_budget = _worker_options.get('time_budget', EXTRACTION_TIME_BUDGET)
+        if kind == 'file' and _worker_options.get('stream'):
+            with open(source, 'rb') as f:
+                record['data'] = extract_info_stream(iter(lambda: f.read(STREAM_BLOCK_BYTES), b''),
+                                                     time_budget=time_budget)
+            return record
+        page = read_task(task, _worker_options.get('segments'))
+        html = page.pop('html')
+        record.update(page)
+        if not html:
+            record['error'] = 'No HTML content provided'
+            return record
+        cache = _worker_options.get('cache')
+        if cache is not None:
+            record['data'], record['cached'] = cache.extract(html, time_budget=time_budget)
+        else:
+            record['data'] = extract_info(html, time_budget=time_budget)
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+def _throttled(tasks, slots):
+    # Pool.imap_unordered drains its input as fast as it can; holding a slot per
+    # task in flight keeps a large tarball or JSONL from being read into memory
+    for task in tasks:
+        slots.acquire()
+        yield task
+
+
+def run(input_path, output, workers=None, chunksize=16, time_budget=EXTRACTION_TIME_BUDGET, cache_path=None,
+        stream=False, since=None, until=None, latest_only=False):
+    """
+    Extract every page of the input on a process pool and write JSONL records to `output`.
+
+    Args:
+      cache_path: SQLite extraction cache shared by the workers; unchanged pages are not re-extracted.
+      stream: Read directory files in blocks with bounded memory instead of whole.
+      since, until, latest_only: Select crawl archive records by fetch time, newest per URL.
+
+    Returns:
+      A dict with the number of pages, cache hits and errors.
+    """
+    workers = workers or os.cpu_count() or 1
+    slots = threading.BoundedSemaphore(chunksize * (workers + 1) * 4)
+    counts = {'pages': 0, 'cached': 0, 'errors': 0}
+    start = time.monotonic()
+    if cache_path:
+        # Create the database once before the workers race to open it
+        ExtractionCache(cache_path).close()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(time_budget, cache_path, stream)) as pool:
+        results = pool.imap_unordered(extract_task, _throttled(iter_tasks(input_path, since, until, latest_only), slots), chunksize=chunksize)
+        for record in results:
+            slots.release()
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            counts['pages'] += 1
+            if 'error' in record:
+                counts['errors'] += 1
+            if record.get('cached'):
+                counts['cached'] += 1
+            if counts['pages'] % 1000 == 0:
+                rate = counts['pages'] / max(time.monotonic() - start, 1e-9)
+                print(f"Extracted {counts['pages']} pages ({rate:.0f}/s, {counts['errors']} errors)", file=sys.stderr)
+    elapsed = time.monotonic() - start
+    print(f"Done: {counts['pages']} pages in {elapsed:.1f}s on {workers} workers, "
+          f"{counts['cached']} from cache, {counts['errors']} errors", file=sys.stderr)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract contact information from a corpus of HTML pages.")
+    parser.add_argument('input', help="Directory or tarball of HTML files, JSONL of {url, html}, or a crawl archive")
+    parser.add_argument('--output', help="JSONL file to write (default: stdout)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=16, help="Pages handed to a worker at a time")
+    parser.add_argument('--time-budget', type=float, default=EXTRACTION_TIME_BUDGET,
+                        help="Seconds of matching allowed per page")
+    parser.add_argument('--cache', help="SQLite extraction cache; pages with unchanged HTML are answered from it")
+    parser.add_argument('--stream', action='store_true',
+                        help="Extract files from a directory in blocks, for pages too large to hold in memory")
+    parser.add_argument('--since', help="Crawl archive: only pages fetched at or after this ISO date/time")
+    parser.add_argument('--until', help="Crawl archive: only pages fetched before this ISO date/time")
+    parser.add_argument('--latest', action='store_true', help="Crawl archive: only the newest fetch of each URL")
+    args = parser.parse_args()
+    if args.stream and args.cache:
+        parser.error("--stream and --cache cannot be combined (the cache key needs the whole page)")
+
+    if not os.path.exists(args.input):
+        parser.error(f"Input not found: {args.input}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            run(args.input, output, args.workers, args.chunksize, args.time_budget, args.cache, args.stream,
+                args.since, args.until, args.latest)
+    else:
+        run(args.input, sys.stdout, args.workers, args.chunksize, args.time_budget, args.cache, args.stream,
+            args.since, args.until, args.latest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Persistent extract_info results keyed by page content.
+
+A page is keyed by the SHA-256 of its whitespace-normalized HTML together
+with a version derived from every pattern in step2.compiled_patterns and
+the match limit, so an unchanged page is answered from the cache and
+editing any pattern starts a fresh cache automatically. Results cut short
+by the time or match budget are not cached, since another run may finish.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+
+import step2
+
+# Bump when the extraction logic around the patterns changes (not needed for pattern edits)
+EXTRACTOR_REVISION = 1
+
+
+def pattern_set_version(compiled_patterns=None):
+    """Short hash of every compiled pattern (source and flags) plus EXTRACTOR_REVISION."""
+    compiled_patterns = compiled_patterns if compiled_patterns is not None else step2.compiled_patterns
+    digest = hashlib.sha256(f"revision {EXTRACTOR_REVISION}\n".encode('utf-8'))
+
+    def add(name, value):
+        if isinstance(value, dict):
+            for key in sorted(value):
+                add(f"{name}.{key}", value[key])
+        else:
+            digest.update(f"{name}\0{value.pattern}\0{value.flags}\n".encode('utf-8'))
+
+    for name in sorted(compiled_patterns):
+        add(name, compiled_patterns[name])
+    return digest.hexdigest()[:16]
+
+
+def content_key(html, version, max_matches=step2.MAX_MATCHES_PER_PATTERN):
+    # Whitespace runs collapse to one space in the extracted text and end hrefs,
+    # so re-indented or re-wrapped markup keeps its key
+    normalized = ' '.join(html.split())
+    return hashlib.sha256(f"{version}\0{max_matches}\0{normalized}".encode('utf-8', errors='replace')).hexdigest()
+
+
+class ExtractionCache:
+    """
+    SQLite cache of extract_info results.
+
+    Safe to share between processes: each opens its own connection and the
+    database runs in WAL mode. Rows from other pattern versions are kept
+    until purge_stale() is called, so switching back to an older pattern
+    set reuses its results.
+    """
+
+    def __init__(self, path, version=None):
+        self.path = path
+        self.version = version or pattern_set_version()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+
+    def _get(self, key):
+        row = self.connection.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, key, result):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (key, version, result, created_at) VALUES (?, ?, ?, ?)",
+            (key, self.version, json.dumps(result, ensure_ascii=False), time.time()),
+        )
+
+    def get(self, html, max_matches=step2.MAX_MATCHES_PER_PATTERN):
+        """Cached result for this page under the current pattern version, or None."""
+        return self._get(content_key(html, self.version, max_matches))
+
+    def put(self, html, result, max_matches=step2.MAX_MATCHES_PER_PATTERN):
+        """Store a complete result; do not store results cut short by a budget."""
+        self._put(content_key(html, self.version, max_matches), result)
+
+    def extract(self, html, time_budget=step2.EXTRACTION_TIME_BUDGET, max_matches=step2.MAX_MATCHES_PER_PATTERN):
+        """
+        extract_info with the cache in front of it.
+
+        Only complete results are stored: a page that ran out of time or
+        hit the match limit is extracted again next time.
+
+        Returns:
+          A (result, cached) tuple.
+        """
+        key = content_key(html, self.version, max_matches)
+        result = self._get(key)
+        if result is not None:
+            self.hits += 1
+            return result, True
+        self.misses += 1
+        status = {}
+        result = step2.extract_info(html, time_budget=time_budget, max_matches=max_matches, status=status)
+        if not status.get('truncated') and not status.get('error'):
+            self._put(key, result)
+        return result, False
+
+    def purge_stale(self):
+        """Delete results from other pattern versions; returns the number removed."""
+        cursor = self.connection.execute("DELETE FROM results WHERE version != ?", (self.version,))
+        return cursor.rowcount
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,292 @@
+"""
+Local HTTP service that runs scrape-and-extract jobs on a worker pool.
+
+    python ingest_service.py --port 8765 --workers 16 --queue-size 2000
+
+Endpoints (JSON in and out):
+
+    POST /jobs          {"url": ...} or {"urls": [...]}, optionally
+                        "mode": "page" (scrape_and_extract, default) or "crawl" (crawl_contacts),
+                        "callback_url", "excerpt_chars", "max_output_bytes"
+                        -> 202 {"job_id", "status", "urls"}, or 429 when the queue is full
+    GET  /jobs/<id>     -> {"job_id", "status", "urls", "done", "results": [...]}
+    GET  /metrics       -> queue depth and capacity, busy workers, job and URL counters
+
+When a job has a callback_url, its final state (the GET /jobs/<id> body) is
+POSTed there once every URL is done. Callbacks only go to the hosts given
+with --callback-host (local addresses by default).
+"""
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+import requests
+
+from step1 import build_session
+from scrape_extract import scrape_and_extract
+from contact_crawler import crawl_contacts
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 1000
+MAX_URLS_PER_JOB = 500
+JOB_RETENTION_SECONDS = 3600
+CALLBACK_TIMEOUT = 10
+DEFAULT_CALLBACK_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+class Job:
+    def __init__(self, urls, mode, callback_url, options):
+        self.id = uuid.uuid4().hex
+        self.urls = urls
+        self.mode = mode
+        self.callback_url = callback_url
+        self.options = options
+        self.results = [None] * len(urls)
+        self.done = 0
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def status(self):
+        if self.finished_at is not None:
+            return 'done'
+        return 'running' if self.done else 'queued'
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'mode': self.mode,
+            'urls': len(self.urls),
+            'done': self.done,
+            'results': [result for result in self.results if result is not None],
+        }
+
+
+class IngestService:
+    """Bounded URL queue, worker threads and job bookkeeping behind the HTTP handler."""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 callback_hosts=DEFAULT_CALLBACK_HOSTS):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queue_size = queue_size
+        self.workers = workers
+        self.callback_hosts = set(callback_hosts)
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.metrics = {
+            'jobs_accepted': 0, 'jobs_rejected': 0, 'jobs_done': 0, 'urls_done': 0, 'urls_failed': 0,
+            'busy_workers': 0, 'callbacks_sent': 0, 'callbacks_failed': 0, 'url_seconds_total': 0.0,
+        }
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f'ingest-worker-{i}', daemon=True).start()
+
+    def submit(self, urls, mode='page', callback_url=None, options=None):
+        """Queue a job; returns it, or None when the queue has no room for all of its URLs."""
+        job = Job(urls, mode, callback_url, options or {})
+        with self.lock:
+            self._purge_old_jobs()
+            # Admit all of a job's URLs or none of them, so a batch is never half queued
+            if self.queue.qsize() + len(urls) > self.queue_size:
+                self.metrics['jobs_rejected'] += 1
+                return None
+            self.jobs[job.id] = job
+            self.metrics['jobs_accepted'] += 1
+            for index in range(len(urls)):
+                self.queue.put_nowait((job, index))
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def metrics_snapshot(self):
+        with self.lock:
+            snapshot = dict(self.metrics)
+            snapshot['queue_depth'] = self.queue.qsize()
+            snapshot['queue_capacity'] = self.queue_size
+            snapshot['workers'] = self.workers
+            snapshot['jobs_in_memory'] = len(self.jobs)
+        finished = snapshot['urls_done']
+        snapshot['url_seconds_avg'] = snapshot['url_seconds_total'] / finished if finished else None
+        return snapshot
+
+    def _purge_old_jobs(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def _session(self):
+        # requests sessions are not thread-safe, so each worker keeps its own
+        if not hasattr(self.local, 'session'):
+            self.local.session = build_session()
+        return self.local.session
+
+    def _run(self, job, url):
+        if job.mode == 'crawl':
+            return crawl_contacts(url, self._session(), **job.options)
+        return scrape_and_extract(url, self._session(), **job.options)
+
+    def _work(self):
+        while True:
+            job, index = self.queue.get()
+            with self.lock:
+                self.metrics['busy_workers'] += 1
+            start = time.monotonic()
+            try:
+                result = self._run(job, job.urls[index])
+            except Exception as e:
+                result = {'url': job.urls[index], 'success': False, 'error': f'Error processing URL: {e}'}
+            elapsed = time.monotonic() - start
+            with self.lock:
+                self.metrics['busy_workers'] -= 1
+                self.metrics['urls_done'] += 1
+                self.metrics['url_seconds_total'] += elapsed
+                if result.get('error'):
+                    self.metrics['urls_failed'] += 1
+                job.results[index] = result
+                job.done += 1
+                finished = job.done == len(job.urls)
+                if finished:
+                    job.finished_at = time.time()
+                    self.metrics['jobs_done'] += 1
+                    body = job.to_dict()
+            self.queue.task_done()
+            if finished and job.callback_url:
+                self._callback(job.callback_url, body)
+
+    def _callback(self, callback_url, body):
+        try:
+            self._session().post(callback_url, json=body, timeout=CALLBACK_TIMEOUT).raise_for_status()
+            outcome = 'callbacks_sent'
+        except requests.exceptions.RequestException as e:
+            print(f"Error sending callback to {callback_url}: {e}")
+            outcome = 'callbacks_failed'
+        with self.lock:
+            self.metrics[outcome] += 1
+
+    def callback_allowed(self, callback_url):
+        parsed = urlparse(callback_url)
+        return parsed.scheme in ('http', 'https') and parsed.hostname in self.callback_hosts
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+
+    def _send(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 429:
+            self.send_header('Retry-After', '5')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path == '/metrics':
+            self._send(200, self.service.metrics_snapshot())
+        elif path.startswith('/jobs/'):
+            job = self.service.get(path[len('/jobs/'):])
+            if job is None:
+                self._send(404, {'error': 'Unknown job'})
+            else:
+                self._send(200, job)
+        else:
+            self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            self._send(404, {'error': 'Not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send(400, {'error': 'Body must be JSON'})
+            return
+        if not isinstance(request, dict):
+            self._send(400, {'error': 'Body must be a JSON object'})
+            return
+
+        urls = request.get('urls') or ([request['url']] if request.get('url') else [])
+        # A string "urls" would otherwise be queued one character at a time
+        if not isinstance(urls, list) or not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            self._send(400, {'error': 'Provide "url" or a non-empty "urls" list of strings'})
+            return
+        if len(urls) > MAX_URLS_PER_JOB:
+            self._send(400, {'error': f'At most {MAX_URLS_PER_JOB} URLs per job'})
+            return
+        mode = request.get('mode', 'page')
+        if mode not in ('page', 'crawl'):
+            self._send(400, {'error': 'mode must be "page" or "crawl"'})
+            return
+        callback_url = request.get('callback_url')
+        if callback_url is not None and not isinstance(callback_url, str):
+            self._send(400, {'error': 'callback_url must be a string'})
+            return
+        if callback_url and not self.service.callback_allowed(callback_url):
+            self._send(400, {'error': 'callback_url host is not allowed'})
+            return
+        options = {}
+        for key in ('excerpt_chars', 'max_output_bytes') if mode == 'page' else ('max_pages',):
+            if request.get(key):
+                try:
+                    value = int(request[key])
+                except (TypeError, ValueError):
+                    value = None
+                if value is None or value <= 0 or isinstance(request[key], bool):
+                    self._send(400, {'error': f'{key} must be a positive integer'})
+                    return
+                options[key] = value
+
+        job = self.service.submit([url.strip() for url in urls], mode, callback_url, options)
+        if job is None:
+            self._send(429, {'error': 'Queue is full, retry later', 'queue_depth': self.service.queue.qsize()})
+            return
+        self._send(202, {'job_id': job.id, 'status': job.status, 'urls': len(urls)})
+
+    def log_message(self, format, *args):
+        # Keep the console for errors; one line per request is too noisy at volume
+        pass
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+          callback_hosts=DEFAULT_CALLBACK_HOSTS):
+    IngestHandler.service = IngestService(workers, queue_size, callback_hosts)
+    server = ThreadingHTTPServer((host, port), IngestHandler)
+    server.daemon_threads = True
+    print(f"Ingest service on http://{host}:{port} ({workers} workers, queue of {queue_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP service for scrape-and-extract jobs.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker threads")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Queued URLs before new jobs get a 429")
+    parser.add_argument('--callback-host', action='append', dest='callback_hosts',
+                        help="Host allowed as a callback target (repeatable; default: local addresses)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.queue_size, args.callback_hosts or DEFAULT_CALLBACK_HOSTS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Fetch a page and extract its contact information in one step.
+
+Replaces the step1.py -> SplitLongToshort.py -> step2.py chain: the page
+is downloaded (up to max_page_bytes), stripped to text once, scanned
+with step2's extract_from_text, and only the compact result is returned,
+optionally with a short text excerpt and capped to max_output_bytes of
+JSON so it fits a Zapier payload.
+
+    python scrape_extract.py https://example-clinic.com --excerpt 300 --max-output-bytes 4000
+
+Zapier code steps run a single file and cannot import step1/step2, so to
+use this as one Zap step paste step1.py and step2.py above this file's
+functions (without their `if 'input_data' in globals()` blocks) and drop
+the two imports.
+"""
+import sys
+import json
+import argparse
+
+import requests
+
+from step1 import build_session, clean_url, headers
+from step2 import html_to_text, extract_from_text, empty_result, EXTRACTION_TIME_BUDGET
+
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+FETCH_TIMEOUT = 5
+
+# Fields dropped or shortened first when the output is over its size cap
+TRIM_ORDER = ('names', 'addresses', 'phones', 'fax', 'emails')
+
+
+def fetch_html(session, url, timeout=FETCH_TIMEOUT, max_page_bytes=MAX_PAGE_BYTES):
+    """
+    Download a page, stopping after max_page_bytes.
+
+    Returns:
+      A (response, html, truncated) tuple.
+    """
+    response = session.get(clean_url(url), headers=headers, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        body = bytearray()
+        truncated = False
+        for block in response.iter_content(chunk_size=65536):
+            body.extend(block)
+            if len(body) >= max_page_bytes:
+                truncated = True
+                del body[max_page_bytes:]
+                break
+        try:
+            html = body.decode(response.encoding or 'utf-8', errors='replace')
+        except LookupError:
+            # Unknown charset in the Content-Type header (e.g. 'charset=utf8mb4')
+            html = body.decode('utf-8', errors='replace')
+        return response, html, truncated
+    finally:
+        response.close()
+
+
+def _output_size(output):
+    return len(json.dumps(output, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def cap_output(output, max_output_bytes):
+    """Shrink a result to at most max_output_bytes of compact JSON, dropping the least useful data first."""
+    if not max_output_bytes or _output_size(output) <= max_output_bytes:
+        return output
+    output['output_truncated'] = True
+    output.pop('excerpt', None)
+    data = output.get('data') or {}
+    if 'social_links' in data and _output_size(output) > max_output_bytes:
+        data['social_links'] = {platform: links[:1] for platform, links in data['social_links'].items()}
+    for field in TRIM_ORDER:
+        values = data.get(field) or []
+        while values and _output_size(output) > max_output_bytes:
+            values.pop()
+    return output
+
+
+def scrape_and_extract(url, session=None, timeout=FETCH_TIMEOUT, max_page_bytes=MAX_PAGE_BYTES,
+                       excerpt_chars=0, max_output_bytes=None, time_budget=EXTRACTION_TIME_BUDGET):
+    """
+    Fetch one URL and return its contact information.
+
+    Args:
+      url: The page to fetch.
+      session: A requests session to reuse (one with step1's retry policy is created if omitted).
+      excerpt_chars: Include the first this many characters of page text (0 for none).
+      max_output_bytes: Cap on the compact JSON size of the result (None for no cap).
+
+    Returns:
+      A dict with url, final_url, status, success, error and data (step2's
+      result shape), plus excerpt, page_truncated and output_truncated when they apply.
+    """
+    session = session or build_session()
+    output = {'url': url, 'final_url': None, 'status': None, 'success': False, 'error': None, 'data': None}
+    try:
+        response, html, truncated = fetch_html(session, url, timeout, max_page_bytes)
+        output['final_url'] = response.url
+        output['status'] = response.status_code
+        if truncated:
+            output['page_truncated'] = True
+    except requests.exceptions.RequestException as e:
+        output['status'] = getattr(e.response, 'status_code', None)
+        output['error'] = f'Error fetching URL: {e}'
+        output['data'] = empty_result()
+        return cap_output(output, max_output_bytes)
+    except ValueError as e:
+        # Malformed URLs (e.g. an unclosed '[') raise ValueError before any request is sent
+        output['error'] = f'Error fetching URL: {e}'
+        output['data'] = empty_result()
+        return cap_output(output, max_output_bytes)
+
+    try:
+        text, hrefs = html_to_text(html)
+        output['data'] = extract_from_text(text, hrefs, time_budget=time_budget)
+        output['success'] = True
+        if excerpt_chars:
+            output['excerpt'] = text[:excerpt_chars]
+    except Exception as e:
+        output['error'] = f'Error in extraction: {e}'
+        output['data'] = empty_result()
+    return cap_output(output, max_output_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch pages and print their contact information as JSON lines.")
+    parser.add_argument('urls', nargs='+', help="URLs to scrape")
+    parser.add_argument('--excerpt', type=int, default=0, help="Characters of page text to include")
+    parser.add_argument('--max-output-bytes', type=int, default=None, help="Cap on each result's JSON size")
+    parser.add_argument('--max-page-bytes', type=int, default=MAX_PAGE_BYTES, help="Stop downloading after this")
+    parser.add_argument('--timeout', type=float, default=FETCH_TIMEOUT, help="Timeout per request in seconds")
+    args = parser.parse_args()
+
+    session = build_session()
+    for url in args.urls:
+        result = scrape_and_extract(url, session, args.timeout, args.max_page_bytes,
+                                    args.excerpt, args.max_output_bytes)
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+if 'input_data' in globals():
+    # Zapier code step (see the module docstring for bundling)
+    output = scrape_and_extract(
+        input_data.get('url', '').strip(),
+        excerpt_chars=int(input_data.get('excerpt_chars') or 0),
+        max_output_bytes=int(input_data.get('max_output_bytes') or 0) or None,
+    )
+elif __name__ == "__main__":
+    main()
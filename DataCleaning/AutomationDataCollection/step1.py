@@ -2,6 +2,14 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, urlunparse
 from bs4 import BeautifulSoup
+import os
+import csv
+import json
+import asyncio
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Check urllib3 version to set the correct parameter
 try:
@@ -29,14 +37,6 @@ def get_retry():
             method_whitelist=["HEAD", "GET", "OPTIONS", "POST"]
         )
 
-# Get the URL from the input data
-url = input_data.get('url', '').strip()
-
-# Clean the URL to remove any unwanted characters like '\r' and '\n'
-parsed_url = urlparse(url)
-clean_path = parsed_url.path.replace('\r', '').replace('\n', '')
-clean_url = urlunparse(parsed_url._replace(path=clean_path))
-
 headers = {
     'User-Agent': (
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
@@ -44,34 +44,179 @@ headers = {
     )
 }
 
+# Clean the URL to remove any unwanted characters like '\r' and '\n'
+def clean_url(url):
+    parsed_url = urlparse(url.strip())
+    clean_path = parsed_url.path.replace('\r', '').replace('\n', '')
+    return urlunparse(parsed_url._replace(path=clean_path))
+
 # Set up a session with retry strategy
-session = requests.Session()
+def build_session():
+    session = requests.Session()
+    retry_strategy = get_retry()
+    adapter = HTTPAdapter(max_retries=retry_strategy)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
-retry_strategy = get_retry()
-adapter = HTTPAdapter(max_retries=retry_strategy)
-session.mount('http://', adapter)
-session.mount('https://', adapter)
+# Extract the entire content of the <body> tag, including all HTML
+def extract_body_html(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    body_tag = soup.body
+    return str(body_tag).strip() if body_tag else ''
 
-try:
-    # Fetch the HTML content with a timeout
-    response = session.get(clean_url, headers=headers, timeout=5)
-    response.raise_for_status()  # Raise an exception for bad status codes
+# Fetch one URL and return a {url, status, html} record, with 'error' set on failure
+def fetch_record(session, url, timeout=5):
+    record = {'url': url, 'status': None, 'html': ''}
+    try:
+        response = session.get(clean_url(url), headers=headers, timeout=timeout)
+        record['status'] = response.status_code
+        response.raise_for_status()  # Raise an exception for bad status codes
+        record['html'] = extract_body_html(response.text)
+    except requests.exceptions.RequestException as e:
+        record['error'] = f'Error fetching URL: {e}'
+    except Exception as e:
+        # Malformed URLs (e.g. an unclosed '[') raise ValueError before any request is sent
+        record['error'] = f'Error fetching URL: {e}'
+    return record
 
-    # Parse the HTML using BeautifulSoup
-    soup = BeautifulSoup(response.text, 'html.parser')
+# URLs scheduled per global fetch slot in fetch_batch, waiting for their host or a slot
+PENDING_PER_SLOT = 50
 
-    # Extract the entire content of the <body> tag, including all HTML
-    body_tag = soup.body
-    if body_tag:
-        body_html = str(body_tag)
-    else:
-        body_html = ''
+# Host of a URL for per-host limits; URLs that cannot be parsed share the '' slot
+def host_of(url):
+    try:
+        return urlparse(url).hostname or ''
+    except ValueError:
+        return ''
 
-    # Output the body HTML
-    output = {'html': body_html.strip()}
+# Read URLs from a CSV (a 'url' column, or the first column), JSONL ({"url": ...}) or plain text file
+def read_url_list(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            url_column = header.index('url') if 'url' in header else 0
+            if 'url' not in header and header and header[0].startswith('http'):
+                yield header[0]
+            for row in reader:
+                if len(row) > url_column and row[url_column].strip():
+                    yield row[url_column].strip()
+        elif path.lower().endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    url = item.get('url') if isinstance(item, dict) else item
+                    if url:
+                        yield url.strip()
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
 
-except requests.exceptions.RequestException as e:
-    output = {'error': f'Error fetching URL: {e}'}
+# Fetch many URLs with bounded concurrency and per-host limits, streaming records to a JSONL file
+async def fetch_batch(urls, output_path, concurrency=20, per_host=2, timeout=5, archive=None):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    # requests sessions are not thread-safe, so each fetch thread keeps its own
+    local = threading.local()
+    # URLs read ahead of the fetches, so a run of one host's URLs waits on its host slot
+    # without holding back the other hosts, while huge URL lists stay cheap
+    pending = asyncio.Semaphore(concurrency * PENDING_PER_SLOT)
+    slots = asyncio.Semaphore(concurrency)
+    host_slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+    counts = {'done': 0, 'errors': 0}
+
+    def fetch_in_thread(url):
+        if not hasattr(local, 'session'):
+            local.session = build_session()
+        record = fetch_record(local.session, url, timeout)
+        # Keep successful pages so extraction can be re-run later without fetching again;
+        # compressing them here keeps the event loop free
+        if archive is not None and 'error' not in record:
+            try:
+                archive.append(url, record['status'], record['html'])
+            except Exception as e:
+                print(f"Error archiving {url}: {e}")
+        return record
+
+    async def fetch_one(url, output):
+        try:
+            # Every URL gets a record: one bad URL must neither vanish nor abort the batch
+            try:
+                # The host slot is taken first so waiting on a busy host never holds a global slot
+                async with host_slots[host_of(url)]:
+                    async with slots:
+                        record = await loop.run_in_executor(executor, fetch_in_thread, url)
+            except Exception as e:
+                record = {'url': url, 'status': None, 'html': '', 'error': f'Error fetching URL: {e}'}
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            counts['done'] += 1
+            if 'error' in record:
+                counts['errors'] += 1
+            if counts['done'] % 100 == 0:
+                print(f"Fetched {counts['done']} URLs ({counts['errors']} errors)")
+        finally:
+            pending.release()
+
+    tasks = set()
+    with open(output_path, 'a', encoding='utf-8') as output:
+        for url in urls:
+            await pending.acquire()
+            task = asyncio.ensure_future(fetch_one(url, output))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    executor.shutdown(wait=True)
+    print(f"Done: {counts['done']} URLs fetched, {counts['errors']} errors, results in {output_path}")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch the <body> HTML of many URLs to a JSONL file.")
+    parser.add_argument('--batch', required=True, help="CSV, JSONL or text file with the URLs to fetch")
+    parser.add_argument('--output', required=True, help="JSONL file to append {url, status, html} records to")
+    parser.add_argument('--concurrency', type=int, default=20, help="Maximum fetches in flight")
+    parser.add_argument('--per-host', type=int, default=2, help="Maximum fetches in flight per host")
+    parser.add_argument('--timeout', type=float, default=5, help="Timeout per request in seconds")
+    parser.add_argument('--archive', help="Directory of compressed crawl segments to append fetched pages to")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.batch):
+        parser.error(f"URL list not found: {args.batch}")
+    archive = None
+    if args.archive:
+        # Imported here so the Zapier step does not need the module
+        from crawl_archive import CrawlArchive
+        archive = CrawlArchive(args.archive)
+    try:
+        asyncio.run(fetch_batch(
+            read_url_list(args.batch), args.output,
+            concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout, archive=archive,
+        ))
+    finally:
+        if archive is not None:
+            archive.close()
+
+if 'input_data' in globals():
+    # Zapier code step: fetch the single URL from the input data
+    url = input_data.get('url', '').strip()
+
+    # Set up a session with retry strategy
+    session = build_session()
+
+    # Fetch the HTML content with a timeout
+    record = fetch_record(session, url, timeout=5)
+    if 'error' in record:
+        output = {'error': record['error']}
+    else:
+        # Output the body HTML
+        output = {'html': record['html']}
 
-# For demonstration purposes, print the output
-print(output)
\ No newline at end of file
+    # For demonstration purposes, print the output
+    print(output)
+elif __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import random
+import unittest
+
+import step2
+
+# Words the fuzzed documents are built from: numbers, labels, titles, names and e-mail pieces
+FUZZ_WORDS = ['555-123-4567', '555 123 4567', '+1 (217) 555-1234', '62701', '7', '25', '123', '12',
+              'Fax:', 'F.', 'fax', 'факс', 'тел.', '传真', 'Dr.', 'Mrs', 'Prof', 'M.', 'Main', 'Street',
+              'Springfield', 'IL', 'John', 'Smith', 'Oak', 'Tree', 'Lane', 'Call', 'us', 'at', 'days', 'a',
+              'week.', 'Open', 'Phone', 'info@clinic.com', 'a.b@x.org', '@', ',', '-', '(', ')', 'today']
+
+
+def per_pattern(text):
+    """Each field's own pattern run alone over the whole text, as extract_info did before the combined scan"""
+    patterns = step2.compiled_patterns
+    phones = [step2.clean_phone(match.group()) for match in patterns['phone'].finditer(text)]
+    fax = [step2.clean_phone(match.group()) for match in patterns['fax'].finditer(text)]
+    names = [match.group().strip() for match in patterns['name'].finditer(text)]
+    names += [match.group().strip() for match in patterns['alt_name'].finditer(text)]
+    addresses = [match.group().strip() for match in patterns['address'].finditer(text)]
+    return {
+        'emails': {match.group() for match in patterns['email'].finditer(text)},
+        'phones': list(dict.fromkeys(phone for phone in phones if phone)),
+        'fax': list(dict.fromkeys(number for number in fax if number)),
+        'names': {name for name in names if step2.is_likely_name(name)},
+        'addresses': {address for address in addresses if len(address.split()) > 2},
+    }
+
+
+def comparable(result):
+    return {
+        'emails': set(result['emails']),
+        'phones': result['phones'],
+        'fax': result['fax'],
+        'names': set(result['names']),
+        'addresses': set(result['addresses']),
+    }
+
+
+class ExtractFromTextTest(unittest.TestCase):
+    """The scans in extract_from_text find what every pattern run alone finds."""
+
+    def assertSameAsPerPattern(self, text):
+        self.assertEqual(comparable(step2.extract_from_text(text)), per_pattern(text), text)
+
+    def test_address_does_not_swallow_phone(self):
+        result = step2.extract_info("<p>Open 7 days a week. Call us at 555-123-4567 today</p>")
+        self.assertEqual(result['phones'], ['5551234567'])
+
+    def test_number_before_phone(self):
+        result = step2.extract_from_text("Over 25 years serving pets call 555 123 4567")
+        self.assertEqual(result['phones'], ['5551234567'])
+
+    def test_address_then_phone(self):
+        text = "123 Main Street, Springfield IL 62701 Phone 217-555-1234"
+        result = step2.extract_from_text(text)
+        self.assertEqual(result['phones'], ['2175551234'])
+        self.assertSameAsPerPattern(text)
+
+    def test_name_inside_address(self):
+        text = "Visit us at 12 Oak Tree Lane or write to Dr. John Smith, Fax: +1 (217) 555-1234"
+        result = step2.extract_from_text(text)
+        self.assertIn('Oak Tree Lane', result['names'])
+        self.assertEqual(result['fax'], ['12175551234'])
+        self.assertSameAsPerPattern(text)
+
+    def test_fuzzed_documents_match_per_pattern(self):
+        rng = random.Random(40)
+        for _ in range(300):
+            words = [rng.choice(FUZZ_WORDS) for _ in range(rng.randint(1, 60))]
+            self.assertSameAsPerPattern(' '.join(words))
+
+    def test_stream_windows_match_whole_text(self):
+        rng = random.Random(41)
+        text = ' '.join(rng.choice(FUZZ_WORDS) for _ in range(4000))
+        html = f"<html><body><p>{text}</p></body></html>"
+        pieces = [html[i:i + 1000] for i in range(0, len(html), 1000)]
+        streamed = step2.extract_info_stream(pieces, window=2048, overlap=512)
+        self.assertEqual(comparable(streamed), comparable(step2.extract_info(html)))
+
+
+# Pages and the phones and fax numbers the original single-pattern step2 found on them
+BASELINE_CASES = [
+    ("Call 5551234567 today", ['5551234567'], []),
+    ("Tel: +15551234567", ['15551234567'], []),
+    ("Telefon: 030 1234567", ['0301234567'], []),
+    ("Phone +44 2079460958", ['442079460958'], []),
+    ("Fax: 0301234567", ['0301234567'], ['0301234567']),
+    ("Praxis Dr. Weber, Hauptstr. 12, 10115 Berlin, Tel. 030 12345678, Fax 030 12345679",
+     ['03012345678', '03012345679'], ['03012345679']),
+]
+
+
+class BaselinePhonesTest(unittest.TestCase):
+    """extract_info still finds the phones and fax numbers the original step2 found."""
+
+    def test_baseline_cases(self):
+        for text, phones, fax in BASELINE_CASES:
+            result = step2.extract_info(f"<p>{text}</p>")
+            self.assertEqual((result['phones'], result['fax']), (phones, fax), text)
+
+    def test_mixed_page_keeps_numbers_but_not_order_ids(self):
+        text = "Berlin office: +49 30 1234567, US 555-123-4567, order 12345678901234567890"
+        result = step2.extract_info(f"<p>{text}</p>")
+        self.assertEqual(result['phones'], ['49301234567', '5551234567'])
+
+
+if __name__ == "__main__":
+    unittest.main()
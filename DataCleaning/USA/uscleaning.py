@@ -1,23 +1,25 @@
-import pandas as pd
 import re
+import pickle
+import sqlite3
+import argparse
+import tempfile
+from itertools import islice
 
-# Load the Excel file
-file_path = '/Users/rishabhkankash/Documents/Coding/DataCleaning/USA/hubspot-crm-exports-all-companies-2024-11-15.xlsx'
-df = pd.read_excel(file_path)
-
-# List out all the column names
-column_names = df.columns.tolist()
-print(column_names)
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 
-# Create a new Excel writer object
+# Default input and output files
+file_path = '/Users/rishabhkankash/Documents/Coding/DataCleaning/USA/hubspot-crm-exports-all-companies-2024-11-15.xlsx'
 output_file_path = '/Users/rishabhkankash/Documents/Coding/DataCleaning/USA/separated_companies.xlsx'
-writer = pd.ExcelWriter(output_file_path, engine='xlsxwriter')
 
-# Convert the "Company Domain Name" column to lowercase for case-insensitive grouping
-df['Company Domain Name'] = df['Company Domain Name'].str.lower()
-
-# Dictionary to keep track of sheet name counts
-sheet_name_counts = {}
+DOMAIN_COLUMN = 'Company Domain Name'
+# Rows read from the export and spooled to disk at a time
+CHUNK_ROWS = 5000
+# Same header look as pandas' to_excel
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(*(Side(style='thin'),) * 4)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
 
 # Function to clean and truncate sheet names
 def clean_sheet_name(name):
@@ -28,20 +30,115 @@ def clean_sheet_name(name):
     # Truncate to 31 characters
     return name[:31]
 
-# Group by the "Company Domain Name" column and write each group to a separate sheet
-for domain_name, group in df.groupby('Company Domain Name'):
-    # Clean and truncate the domain name
-    clean_name = clean_sheet_name(domain_name)
-    if clean_name in sheet_name_counts:
-        sheet_name_counts[clean_name] += 1
-        sheet_name = f"{clean_name}_{sheet_name_counts[clean_name]}"
-        # Ensure the final sheet name is within the 31 character limit
-        sheet_name = sheet_name[:31]
-    else:
-        sheet_name_counts[clean_name] = 1
-        sheet_name = clean_name
-    
-    group.to_excel(writer, sheet_name=sheet_name, index=False)
-
-# Save the new Excel file
-writer.close()
\ No newline at end of file
+# Function to read the export's header and its rows in chunks
+def read_export(path, chunk_rows=CHUNK_ROWS):
+    # read_only streams the sheet's XML instead of loading every cell
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    header = list(next(rows, ()))
+    # Drop trailing empty header cells; read-only sheets can report a stale, wider dimension
+    while header and header[-1] is None:
+        header.pop()
+
+    def chunks():
+        try:
+            while True:
+                chunk = [list(row[:len(header)]) for row in islice(rows, chunk_rows)]
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            workbook.close()
+
+    return header, chunks()
+
+# Function to spool rows to a temporary SQLite file, keyed by lowercase domain
+def spool_by_domain(connection, header, chunks):
+    domain_index = header.index(DOMAIN_COLUMN)
+    connection.execute("CREATE TABLE rows (domain TEXT NOT NULL, seq INTEGER NOT NULL, data BLOB NOT NULL)")
+    seq = 0
+    for chunk in chunks:
+        batch = []
+        for row in chunk:
+            row += [None] * (len(header) - len(row))
+            domain = row[domain_index]
+            # Rows without a text domain are left out, as groupby leaves out missing keys
+            if not isinstance(domain, str):
+                continue
+            row[domain_index] = domain = domain.lower()
+            batch.append((domain, seq, pickle.dumps(row)))
+            seq += 1
+        connection.executemany("INSERT INTO rows VALUES (?, ?, ?)", batch)
+        connection.commit()
+    connection.execute("CREATE INDEX rows_domain ON rows (domain, seq)")
+    return seq
+
+# Function to write a header row in pandas' style
+def header_row(worksheet, header):
+    cells = []
+    for name in header:
+        cell = WriteOnlyCell(worksheet, value=name)
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+# Function to write one sheet per domain, in domain order, one row at a time
+def write_sheets(connection, header, output_path):
+    # Write-only sheets stream rows to a temporary file; closing one when its
+    # domain is done also releases its file handle, however many domains there are
+    workbook = Workbook(write_only=True)
+    # Dictionary to keep track of sheet name counts
+    sheet_name_counts = {}
+    worksheet = None
+    current_domain = None
+    sheets = 0
+    for domain_name, data in connection.execute("SELECT domain, data FROM rows ORDER BY domain, seq"):
+        if domain_name != current_domain:
+            if worksheet is not None:
+                worksheet.close()
+            # Clean and truncate the domain name
+            clean_name = clean_sheet_name(domain_name)
+            if clean_name in sheet_name_counts:
+                sheet_name_counts[clean_name] += 1
+                sheet_name = f"{clean_name}_{sheet_name_counts[clean_name]}"
+                # Ensure the final sheet name is within the 31 character limit
+                sheet_name = sheet_name[:31]
+            else:
+                sheet_name_counts[clean_name] = 1
+                sheet_name = clean_name
+            worksheet = workbook.create_sheet(sheet_name)
+            worksheet.append(header_row(worksheet, header))
+            current_domain = domain_name
+            sheets += 1
+        worksheet.append(pickle.loads(data))
+    # Save the new Excel file
+    workbook.save(output_path)
+    return sheets
+
+# Function to split an export into one sheet per company domain with flat memory use
+def split_by_domain(input_path, output_path, chunk_rows=CHUNK_ROWS, temp_dir=None):
+    header, chunks = read_export(input_path, chunk_rows)
+    # List out all the column names
+    print(header)
+    with tempfile.NamedTemporaryFile(suffix='.sqlite3', dir=temp_dir) as spool:
+        connection = sqlite3.connect(spool.name)
+        # The spool is thrown away afterwards, so skip the journal and fsyncs
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        try:
+            rows = spool_by_domain(connection, header, chunks)
+            sheets = write_sheets(connection, header, output_path)
+        finally:
+            connection.close()
+    print(f"Wrote {rows} rows to {sheets} sheets in {output_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a HubSpot company export into one sheet per domain.")
+    parser.add_argument('input', nargs='?', default=file_path, help="HubSpot companies export (.xlsx)")
+    parser.add_argument('output', nargs='?', default=output_file_path, help="Workbook to write")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows read per chunk")
+    parser.add_argument('--temp-dir', default=None, help="Directory for the temporary row spool")
+    args = parser.parse_args()
+    split_by_domain(args.input, args.output, args.chunk_rows, args.temp_dir)
@@ -1,65 +1,193 @@
 import os
-import pandas as pd
 import openai
 from openai import OpenAI  # Correct import for OpenAI class
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from azure.cognitiveservices.search.websearch import WebSearchClient
 from msrest.authentication import CognitiveServicesCredentials
-from urllib.parse import urlparse, urlunparse, urljoin
+from urllib.parse import urlparse, urlunparse
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 import requests
-from bs4 import BeautifulSoup
 import time
+import uuid
+import tempfile
+import multiprocessing
+from semantic_cache import SemanticCache
+from negative_cache import NegativeResultCache, ColumnFillStats
+from row_keys import entity_key, build_row_context, row_record
+from run_planner import plan_run, format_plan
+from run_metrics import RunMetrics
+from cell_scheduler import RunBudget, schedule_cells
+from sheet_loader import load_excel_frame
+from prompts import build_column_schema, query_messages, extraction_messages
+from job_queue import JobQueue
+from model_cascade import run_cascade, validate_query, validate_value
+from query_templates import load_query_templates, build_templated_query
+from page_document import PageDocument
+from deadlines import Deadline, LatencyTracker, fetch_pages_hedged
+from entity_store import EntityStore
+from quota_limiter import QuotaLimiter
 
 # Replace with your API keys
 openai.api_key = "sk-proj-"  # OpenAI API Key
 BING_API_KEY = ""      # Bing Web Search API Key
 
+# Semantic near-duplicate cache (optional, needs sentence-transformers; hnswlib is used when installed)
+SEMANTIC_CACHE_ENABLED = False
+SEMANTIC_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'semantic_cache')
+SEMANTIC_CACHE_MODEL = 'all-MiniLM-L6-v2'
+SEMANTIC_CACHE_THRESHOLD = 0.92  # Minimum cosine similarity to reuse an earlier answer
+
+# "Not found" cache and adaptive column skipping
+NEGATIVE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'negative_cache.json')
+NEGATIVE_CACHE_TTL_DAYS = 30
+COLUMN_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'column_fill_stats.json')
+MIN_COLUMN_FILL_RATE = 0.05  # Columns filling less often than this are skipped
+MIN_COLUMN_ATTEMPTS = 20     # Attempts needed before a column can be skipped
+
+# Model cascades: the cheapest model is tried first, larger ones only when its answer
+# fails validation (wrong phone/URL/email format) or reports low confidence
+QUERY_MODEL_CASCADE = ["gpt-4o-mini", "gpt-4o"]
+EXTRACTION_MODEL_CASCADE = ["gpt-4o-mini", "gpt-4o"]
+MIN_EXTRACTION_CONFIDENCE = 'medium'
+ESCALATE_ON_NOT_FOUND = False
+EXTRACTION_MAX_CONTENT_CHARS = 200000  # Keeps the prompt inside the smallest model's context window
+MAX_PAGE_LINKS = 40  # mailto:, tel: and off-site links added to the extraction input per page
+
+# Per-column search query templates, used before asking the model for a query
+QUERY_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_templates.json')
+
+# Time budgets in seconds; each stage is also bounded by the cell budget
+CELL_DEADLINE_SECONDS = 180
+STAGE_DEADLINE_SECONDS = {
+    'query': 30,
+    'search': 20,
+    'fetch': 45,
+    'images': 40,
+    'extract': 45,
+}
+FETCH_TIMEOUT_SECONDS = 15
+HEDGED_FETCHES = True  # Start the next-ranked URL when a fetch passes its p90 latency
+
+# Facts read from every fetched site, keyed by domain and reused across rows, columns and files
+ENTITY_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'entity_store.sqlite3')
+
+# API quotas shared by every CRMauto process on this machine, as (units per second, burst)
+QUOTA_DB_PATH = os.path.join(tempfile.gettempdir(), 'crmauto_api_quota.sqlite3')
+API_QUOTAS = {
+    ('openai', 'chat.completions/gpt-4o-mini'): (500 / 60, 20),
+    ('openai', 'chat.tokens/gpt-4o-mini'): (200000 / 60, 40000),
+    ('openai', 'chat.completions/gpt-4o'): (500 / 60, 20),
+    ('openai', 'chat.tokens/gpt-4o'): (30000 / 60, 30000),
+    ('bing', 'web.search'): (3, 3),
+    ('bing', 'images.visualsearch'): (3, 3),
+}
+
+# Number of worker processes enriching cells at the same time; above 1, cells are
+# shared out through a durable local job queue
+ENRICHMENT_CONCURRENCY = 1
+# Workers are spawned, not forked: each imports this script afresh and opens its own SQLite
+# connections and cache copies instead of sharing the parent's open handles
+ENRICHMENT_START_METHOD = 'spawn'
+JOB_QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'enrichment_queue.sqlite3')
+
+# Cell priorities: missing cells are enriched in order of column weight x row weight
+# (x the column's fill rate), unlisted columns and values weigh 1. Column weights are
+# keyed by column name or by a keyword found as a whole word in it, so they apply to
+# the columns left after the drop (e.g. 'phone' for 'Clinic Phone')
+COLUMN_WEIGHTS = {
+    'phone': 10,
+    'email': 10,
+    'address': 8,
+    'postal': 5,
+    'zip': 5,
+    'city': 5,
+    'website': 5,
+}
+ROW_PRIORITIES = {
+    'Ideal Customer Profile Tier': {'Tier 1': 3, 'Tier 2': 2, 'Tier 3': 1},
+    'Lead Status': {'Open Deal': 3, 'In Progress': 2, 'Connected': 2, 'New': 1.5, 'Unqualified': 0.3},
+    'Target Account': {'true': 2, 'yes': 2},
+}
+
+# Hard limits per file; None means unbounded
+RUN_MAX_TOKENS = None
+RUN_MAX_DOLLARS = None
+RUN_MAX_SECONDS = None
+
 # Initialize OpenAI client
 client = OpenAI(api_key=openai.api_key)
 
-# Function to generate search queries using OpenAI
-def generate_search_query(missing_column, row_data):
-    context = ''
-    for col, val in row_data.items():
-        if col != missing_column and pd.notna(val) and val != '':
-            context += f"{col}: {val}\n"
+# Initialize the semantic cache
+semantic_cache = SemanticCache(
+    SEMANTIC_CACHE_DIR,
+    model_name=SEMANTIC_CACHE_MODEL,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+) if SEMANTIC_CACHE_ENABLED else None
 
-    if not context:
-        return None
+# Initialize the "Not found" cache and column fill statistics
+negative_cache = NegativeResultCache(NEGATIVE_CACHE_PATH, ttl_seconds=NEGATIVE_CACHE_TTL_DAYS * 24 * 3600)
+column_stats = ColumnFillStats(
+    COLUMN_STATS_PATH,
+    min_fill_rate=MIN_COLUMN_FILL_RATE,
+    min_attempts=MIN_COLUMN_ATTEMPTS,
+)
 
-    prompt = f"""You are a helpful assistant. Given the following information, generate a concise search query to find the '{missing_column}':
+# Load search query templates
+query_templates = load_query_templates(QUERY_TEMPLATES_PATH)
 
-{context}
+# Page fetch latencies, used to decide when to hedge
+fetch_latency = LatencyTracker()
 
-Search Query:"""
+# Open the entity knowledge store
+entity_store = EntityStore(ENTITY_STORE_PATH)
 
-    try:
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=50,
-            n=1,
-            temperature=0.5,
-        )
-        query = completion.choices[0].message.content.strip()
-        return query
-    except Exception as e:
-        print(f"Error generating search query: {e}")
+# Shared API quota limiter
+quota_limiter = QuotaLimiter(QUOTA_DB_PATH, API_QUOTAS)
+
+# Calls, tokens and dollars spent by the current run
+run_metrics = RunMetrics()
+
+# Function to generate search queries using OpenAI
+def generate_search_query(missing_column, row_data, deadline=None, schema=''):
+    context = build_row_context(missing_column, row_data)
+
+    if not context:
         return None
 
+    query, _, model = run_cascade(
+        client,
+        QUERY_MODEL_CASCADE,
+        query_messages(schema, missing_column, context),
+        validate_query,
+        deadline=deadline,
+        limiter=quota_limiter,
+        on_completion=run_metrics.record_completion,
+        max_tokens=50,
+        n=1,
+        temperature=0.5,
+    )
+    if not query:
+        print(f"Error generating search query for '{missing_column}'")
+        return None
+    print(f"   Query generated by {model}")
+    return query.strip('"')
+
 # Function to perform web search using Bing Web Search API
-def perform_web_search(query):
+# Returns the result URLs, [] when the search found nothing, or None when it failed
+def perform_web_search(query, deadline=None):
     try:
         client_bing = WebSearchClient(
             endpoint="https://api.bing.microsoft.com/v7.0",  # Ensure the correct endpoint
             credentials=CognitiveServicesCredentials(BING_API_KEY)
         )
+        if deadline is not None:
+            client_bing.config.connection.timeout = deadline.timeout(10)
+        if not quota_limiter.acquire('bing', 'web.search', deadline=deadline):
+            print(f"Search quota not available before the deadline for '{query}'")
+            return None
+        run_metrics.searches += 1
         web_data = client_bing.web.search(query=query)
         if web_data.web_pages:
             # Get URLs of the top 10 search results
@@ -69,7 +197,7 @@ def perform_web_search(query):
             return []
     except Exception as e:
         print(f"Error performing web search: {e}")
-        return []
+        return None
 
 # Function to modify the query for retries
 def modify_query(query):
@@ -79,29 +207,39 @@ def modify_query(query):
     return query
 
 # Function to perform web search with retry mechanism
-def perform_web_search_with_retry(query, max_retries=2):
+# Returns [] only when a search completed without results, None when none completed
+def perform_web_search_with_retry(query, max_retries=2, deadline=None):
+    result = None
     for attempt in range(max_retries):
-        urls = perform_web_search(query)
+        if deadline is not None and deadline.expired():
+            print(f"   Search deadline reached for '{query}'. Skipping...")
+            break
+        urls = perform_web_search(query, deadline)
         if urls:
             return urls
         else:
-            print(f"   No search results found for '{query}'.")
+            if urls is None:
+                print(f"   Search failed for '{query}'.")
+            else:
+                result = []
+                print(f"   No search results found for '{query}'.")
             if attempt < max_retries - 1:
                 print(f"   Modifying query and retrying...")
                 query = modify_query(query)
             else:
                 print(f"   All retries exhausted for query '{query}'. Skipping...")
-    return []
+    return result
 
 # Function to fetch HTML body from a URL
-def fetch_html_body(url):
+def fetch_html_body(url, timeout=FETCH_TIMEOUT_SECONDS):
     headers = {
         'User-Agent': (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         )
     }
+    run_metrics.page_fetches += 1
     try:
-        response = requests.get(url, headers=headers)
+        response = requests.get(url, headers=headers, timeout=timeout)
         if response.status_code == 200:
             return response.text
         else:
@@ -111,26 +249,16 @@ def fetch_html_body(url):
         print(f"Error fetching HTML body: {e}")
         return None
 
-# Function to extract image URLs from HTML content
-def extract_image_urls(html_content, base_url):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    image_urls = []
-    for img in soup.find_all('img'):
-        src = img.get('src')
-        if src:
-            image_url = urljoin(base_url, src)
-            image_urls.append(image_url)
-    return image_urls
-
 # Function to download image from URL
-def download_image(image_url):
+def download_image(image_url, deadline=None):
     headers = {
         'User-Agent': (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
         )
     }
+    timeout = deadline.timeout(10) if deadline is not None else 10
     try:
-        response = requests.get(image_url, headers=headers, timeout=10)
+        response = requests.get(image_url, headers=headers, timeout=timeout)
         response.raise_for_status()
         return response.content  # Return image bytes
     except Exception as e:
@@ -138,7 +266,7 @@ def download_image(image_url):
         return None
 
 # Function to perform reverse image search using Bing Visual Search API
-def perform_reverse_image_search(image_bytes):
+def perform_reverse_image_search(image_bytes, deadline=None):
     endpoint = 'https://api.bing.microsoft.com/v7.0/images/visualsearch'
     headers = {
         'Ocp-Apim-Subscription-Key': BING_API_KEY,
@@ -146,8 +274,12 @@ def perform_reverse_image_search(image_bytes):
     files = {
         'image': ('image.jpg', image_bytes, 'multipart/form-data')
     }
+    if not quota_limiter.acquire('bing', 'images.visualsearch', deadline=deadline):
+        return None
+    run_metrics.image_lookups += 1
+    timeout = deadline.timeout(10) if deadline is not None else 10
     try:
-        response = requests.post(endpoint, headers=headers, files=files, timeout=10)
+        response = requests.post(endpoint, headers=headers, files=files, timeout=timeout)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -173,118 +305,355 @@ def extract_image_description(visual_search_response):
     return ' '.join(descriptions)
 
 # Function to extract required information using OpenAI
-def extract_information(missing_column, html_contents):
+def extract_information(missing_column, html_contents, deadline=None, schema=''):
     # Combine all HTML contents
-    combined_text = ' '.join(html_contents)
-
-    prompt = f"""Based on the following web page content and image descriptions, extract the '{missing_column}'. If the information is not found, reply with 'Not found'.
-    
-Web Content and Image Descriptions:
-{combined_text}
-
-{missing_column}:"""
+    combined_text = ' '.join(html_contents)[:EXTRACTION_MAX_CONTENT_CHARS]
+
+    result, confidence, model = run_cascade(
+        client,
+        EXTRACTION_MODEL_CASCADE,
+        extraction_messages(schema, missing_column, combined_text),
+        lambda value: validate_value(missing_column, value),
+        min_confidence=MIN_EXTRACTION_CONFIDENCE,
+        escalate_on_not_found=ESCALATE_ON_NOT_FOUND,
+        deadline=deadline,
+        limiter=quota_limiter,
+        on_completion=run_metrics.record_completion,
+        max_tokens=100,
+        n=1,
+        temperature=0.3,
+    )
+    if result is None:
+        print(f"Error extracting information for '{missing_column}'")
+        return None
+    print(f"   Extracted by {model} (confidence: {confidence or 'unknown'})")
+    if not validate_value(missing_column, result):
+        print(f"   '{result}' does not look like a valid '{missing_column}', discarding it.")
+        return None
+    return result
+
+# Function to look up or search for one missing cell
+# Returns (value, outcome), outcome being 'entity_store', 'semantic_cache', 'known_missing',
+# 'low_fill_rate', 'filled', 'not_found', 'no_results' or 'error'; record_outcome applies it
+# to the caches. Only 'not_found' (the model read the pages and found nothing) is cached.
+def fill_cell(column, row_data, row_number, schema, cell_seconds=None):
+    entity = entity_key(row_data)
+
+    # Reuse a fact already read from this company's website
+    stored_info = entity_store.lookup(entity, column)
+    if stored_info:
+        print(f" - Filled '{column}' from entity store with: {stored_info}")
+        return stored_info, 'entity_store'
+    if negative_cache.is_known_missing(entity, column):
+        print(f" - Missing '{column}', recently not found for '{entity}'. Skipping...")
+        return None, 'known_missing'
+    if column_stats.should_skip(column):
+        print(f" - Missing '{column}', column fill rate is below {MIN_COLUMN_FILL_RATE:.0%}. Skipping...")
+        return None, 'low_fill_rate'
+
+    # Step 0: Reuse an answer from a near-duplicate row, if any
+    context = build_row_context(column, row_data)
+    if semantic_cache:
+        cached_info = semantic_cache.lookup(column, context)
+        if cached_info:
+            print(f"   Filled '{column}' from semantic cache with: {cached_info}")
+            return cached_info, 'semantic_cache'
+
+    cell_deadline = Deadline(CELL_DEADLINE_SECONDS if cell_seconds is None else min(CELL_DEADLINE_SECONDS, cell_seconds))
+
+    # Step 1: Build the search query from a template and search with it
+    urls = None
+    query = build_templated_query(column, row_data, query_templates)
+    if query:
+        print(f" - Missing '{column}', templated search query: {query}")
+        urls = perform_web_search_with_retry(
+            query, max_retries=1, deadline=cell_deadline.stage(STAGE_DEADLINE_SECONDS['search'])
+        )
 
-    try:
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=100,
-            n=1,
-            temperature=0.3,
+    # Step 2: Fall back to a generated query when the template could not be used
+    if not urls:
+        print(f" - Missing '{column}', generating search query...")
+        query = generate_search_query(
+            column, row_data, deadline=cell_deadline.stage(STAGE_DEADLINE_SECONDS['query']), schema=schema
         )
-        result = completion.choices[0].message['content'].strip()
-        return result
-    except Exception as e:
-        print(f"Error extracting information: {e}")
-        return None
+        if not query:
+            print(f"   Error generating search query for '{column}'. Skipping...")
+            return None, 'error'
+        print(f"   Search query: {query}")
+
+        # Perform web search with retry and get URLs; if this search fails, a templated
+        # search that completed without results still counts as "no results"
+        generated_urls = perform_web_search_with_retry(
+            query, deadline=cell_deadline.stage(STAGE_DEADLINE_SECONDS['search'])
+        )
+        if generated_urls is not None:
+            urls = generated_urls
+    if urls is None:
+        print(f"   Search failed for '{query}'. Skipping...")
+        return None, 'error'
+    if not urls:
+        print(f"   No search results found for '{query}'. Skipping...")
+        return None, 'no_results'
+    print(f"   Retrieved URLs: {urls}")
+
+    # Step 3: Fetch HTML bodies from URLs, hedging slow sites with the next-ranked URL
+    fetched_pages = fetch_pages_hedged(
+        urls,
+        fetch_html_body,
+        cell_deadline.stage(STAGE_DEADLINE_SECONDS['fetch']),
+        fetch_latency,
+        hedge=HEDGED_FETCHES,
+        fetch_timeout=FETCH_TIMEOUT_SECONDS,
+    )
+
+    # Parse each page once; its text and link targets go to the prompt and its images to visual search
+    html_contents = []
+    image_deadline = cell_deadline.stage(STAGE_DEADLINE_SECONDS['images'])
+    for url, html_content in fetched_pages:
+        print(f"   Fetched content from URL: {url}")
+        page = PageDocument(url, html_content)
+        html_contents.append(page.text)
+        # Emails, phone numbers and social profiles often appear only in href attributes
+        if page.contact_links:
+            html_contents.append(f"Links on {url}: " + '; '.join(page.contact_links[:MAX_PAGE_LINKS]))
+        entity_store.record_page(page)
+
+        # Extract image URLs
+        image_urls = page.images
+        if image_urls and not image_deadline.expired():
+            # Limit the number of images to process per page
+            image_urls = image_urls[:3]
+            for image_url in image_urls:
+                if image_deadline.expired():
+                    print("   Image deadline reached, skipping remaining images.")
+                    break
+                print(f"   Processing image: {image_url}")
+                image_bytes = download_image(image_url, deadline=image_deadline)
+                if image_bytes:
+                    visual_search_response = perform_reverse_image_search(image_bytes, deadline=image_deadline)
+                    if visual_search_response:
+                        # Extract image description
+                        image_description = extract_image_description(visual_search_response)
+                        if image_description:
+                            # Add image description to html_contents
+                            html_contents.append(image_description)
+                time.sleep(1)  # Be polite and avoid rapid requests
+
+    if not html_contents:
+        print(f"   No content fetched from URLs. Skipping...")
+        return None, 'error'
+
+    # Step 4: Extract information using OpenAI
+    print(f"   Extracting '{column}' from web content and image descriptions...")
+    extracted_info = extract_information(
+        column, html_contents, deadline=cell_deadline.stage(STAGE_DEADLINE_SECONDS['extract']), schema=schema
+    )
+    if extracted_info and extracted_info.lower() != 'not found':
+        print(f"   Filled '{column}' with: {extracted_info}")
+        return extracted_info, 'filled'
+    print(f"   Could not extract '{column}' for row {row_number}.")
+    return None, 'not_found' if extracted_info else 'error'
+
+# Function to update caches, fill statistics and metrics with the outcome of one cell
+def record_outcome(column, row_data, value, outcome):
+    entity = entity_key(row_data)
+    if outcome in ('filled', 'not_found', 'no_results', 'error'):
+        run_metrics.cells_attempted += 1
+    if outcome == 'entity_store':
+        column_stats.record(column, filled=True)
+    elif outcome == 'filled':
+        if semantic_cache:
+            semantic_cache.add(column, build_row_context(column, row_data), value)
+        negative_cache.clear(entity, column)
+        column_stats.record(column, filled=True)
+        run_metrics.cells_filled += 1
+    elif outcome == 'not_found':
+        negative_cache.record_missing(entity, column)
+        column_stats.record(column, filled=False)
 
 # Function to fill missing information in a DataFrame
-def fill_missing_info(df):
+def fill_missing_info(df, weights=None, budget=None, identities=None):
+    headers = df.columns.tolist()
+    print(f"Headers: {headers}")
+    # Same for every cell of the file, so it forms the cacheable prompt prefix
+    schema = build_column_schema(headers)
+    # Highest value cells first, so a run stopped on budget has already filled them
+    cells = schedule_cells(df, COLUMN_WEIGHTS, weights=weights, column_stats=column_stats)
+    total_cells = len(cells)
+    for position, (index, column) in enumerate(cells):
+        if budget:
+            exhausted = budget.exhausted(run_metrics)
+            if exhausted:
+                print(f"\nStopping: {exhausted} reached with {total_cells - position} cells left.")
+                break
+        row_data = row_record(df, index, identities)
+        print(f"\nProcessing cell {position+1}/{total_cells}: row {index+1}, '{column}'")
+        value, outcome = fill_cell(
+            column, row_data, index + 1, schema,
+            cell_seconds=budget.remaining_seconds(run_metrics) if budget else None,
+        )
+        if value:
+            df.at[index, column] = value
+        record_outcome(column, row_data, value, outcome)
+    return df
+
+# Function to report the expected work for an Excel file without calling any API
+def plan_excel_file(input_path):
+    df, _, identities = load_excel_frame(input_path, ROW_PRIORITIES)
+    return plan_run(
+        df,
+        query_templates,
+        QUERY_MODEL_CASCADE,
+        EXTRACTION_MODEL_CASCADE,
+        EXTRACTION_MAX_CONTENT_CHARS,
+        CELL_DEADLINE_SECONDS,
+        concurrency=ENRICHMENT_CONCURRENCY,
+        entity_store=entity_store,
+        negative_cache=negative_cache,
+        column_stats=column_stats,
+        semantic_cache=semantic_cache,
+        identities=identities,
+    )
+
+# Function run by each enrichment worker process: claim cells until the run has none left
+# Caches are read-only here: outcomes go back through the queue and the parent records them
+def enrichment_worker(queue_path, run_id, schema, worker_id):
+    queue = JobQueue(queue_path, lease_seconds=CELL_DEADLINE_SECONDS * 2)
+    while True:
+        claimed = queue.claim(run_id, worker_id)
+        if claimed is None:
+            counts = queue.counts(run_id)
+            if not counts.get('pending') and not counts.get('claimed'):
+                break
+            # Other workers hold the remaining cells; wait in case one of their leases expires
+            time.sleep(2)
+            continue
+        task_id, task = claimed
+        before = run_metrics.snapshot()
+        print(f"\n[{worker_id}] Processing row {task['row_number']}, '{task['column']}'")
+        try:
+            value, outcome = fill_cell(task['column'], task['row_data'], task['row_number'], schema)
+        except Exception as e:
+            print(f"[{worker_id}] Error filling '{task['column']}' for row {task['row_number']}: {e}")
+            value, outcome = None, 'error'
+        queue.complete(task_id, worker_id, {
+            'value': value,
+            'outcome': outcome,
+            'metrics_before': before,
+            'metrics_after': run_metrics.snapshot(),
+        })
+    queue.close()
+    entity_store.close()
+
+# Function to fill missing information with several worker processes sharing a job queue
+def fill_missing_info_sharded(df, weights=None, budget=None, identities=None, workers=ENRICHMENT_CONCURRENCY):
     headers = df.columns.tolist()
     print(f"Headers: {headers}")
-    total_rows = len(df)
-    for index, row in df.iterrows():
-        row_data = row.to_dict()
-        print(f"\nProcessing row {index+1}/{total_rows}")
-        for column in headers:
-            if pd.isna(row[column]) or row[column] == '':
-                print(f" - Missing '{column}', generating search query...")
-                # Step 1: Generate search query
-                query = generate_search_query(column, row_data)
-                if not query:
-                    print(f"   Error generating search query for '{column}'. Skipping...")
-                    continue
-                print(f"   Search query: {query}")
-
-                # Step 2: Perform web search with retry and get URLs
-                urls = perform_web_search_with_retry(query)
-                if not urls:
-                    print(f"   No search results found for '{query}'. Skipping...")
-                    continue
-                print(f"   Retrieved URLs: {urls}")
-
-                # Step 3: Fetch HTML bodies from URLs and process images
-                html_contents = []
-                for url in urls:
-                    print(f"   Fetching content from URL: {url}")
-                    html_content = fetch_html_body(url)
-                    if html_content:
-                        html_contents.append(html_content)
-
-                        # Extract image URLs
-                        image_urls = extract_image_urls(html_content, url)
-                        if image_urls:
-                            # Limit the number of images to process per page
-                            image_urls = image_urls[:3]
-                            for image_url in image_urls:
-                                print(f"   Processing image: {image_url}")
-                                image_bytes = download_image(image_url)
-                                if image_bytes:
-                                    visual_search_response = perform_reverse_image_search(image_bytes)
-                                    if visual_search_response:
-                                        # Extract image description
-                                        image_description = extract_image_description(visual_search_response)
-                                        if image_description:
-                                            # Add image description to html_contents
-                                            html_contents.append(image_description)
-                                time.sleep(1)  # Be polite and avoid rapid requests
-
-                    time.sleep(1)  # Be polite and avoid rapid requests
-
-                if not html_contents:
-                    print(f"   No content fetched from URLs. Skipping...")
-                    continue
-
-                # Step 4: Extract information using OpenAI
-                print(f"   Extracting '{column}' from web content and image descriptions...")
-                extracted_info = extract_information(column, html_contents)
-                if extracted_info and extracted_info.lower() != 'not found':
-                    df.at[index, column] = extracted_info
-                    print(f"   Filled '{column}' with: {extracted_info}")
-                else:
-                    print(f"   Could not extract '{column}' for row {index+1}.")
+    schema = build_column_schema(headers)
+    cells = schedule_cells(df, COLUMN_WEIGHTS, weights=weights, column_stats=column_stats)
+    total_cells = len(cells)
+    if not total_cells:
+        return df
+
+    # One task per missing cell, highest priority first
+    run_id = uuid.uuid4().hex
+    queue = JobQueue(JOB_QUEUE_PATH, lease_seconds=CELL_DEADLINE_SECONDS * 2)
+    queue.enqueue(run_id, [
+        (total_cells - position, {
+            'row_index': int(index),
+            'row_number': int(index) + 1,
+            'column': column,
+            'row_data': row_record(df, index, identities),
+        })
+        for position, (index, column) in enumerate(cells)
+    ])
+    print(f"Queued {total_cells} cells for {workers} workers (run {run_id})")
+
+    # Spawned workers load the JSON caches from disk, so save what this process has learned first
+    if semantic_cache:
+        semantic_cache.save()
+    negative_cache.save()
+    column_stats.save()
+    context = multiprocessing.get_context(ENRICHMENT_START_METHOD)
+
+    def start_worker(number):
+        process = context.Process(
+            target=enrichment_worker, args=(JOB_QUEUE_PATH, run_id, schema, f"worker-{number}"), daemon=True
+        )
+        process.start()
+        return process
+
+    # Merge finished cells back into the sheet; this process holds the only cache copies that are saved
+    def merge_results():
+        count = 0
+        for task, result in queue.take_results(run_id):
+            count += 1
+            value, outcome = result.get('value'), result.get('outcome', 'error')
+            if value:
+                df.at[task['row_index'], task['column']] = value
+            record_outcome(task['column'], task['row_data'], value, outcome)
+            if 'metrics_after' in result:
+                run_metrics.merge(result['metrics_before'], result['metrics_after'])
+        return count
+
+    processes = [start_worker(number) for number in range(workers)]
+    started = workers
+    merged = 0
+    stopped = False
+    try:
+        while True:
+            merged += merge_results()
+            if budget and not stopped:
+                exhausted = budget.exhausted(run_metrics)
+                if exhausted:
+                    cancelled = queue.cancel_pending(run_id)
+                    print(f"\nStopping: {exhausted} reached, {cancelled} cells cancelled.")
+                    stopped = True
+
+            counts = queue.counts(run_id)
+            if not counts.get('pending') and not counts.get('claimed'):
+                merged += merge_results()
+                break
+
+            # Replace workers that died; their leased cells are picked up again once the lease expires
+            for position, process in enumerate(processes):
+                if not process.is_alive() and (counts.get('pending') or counts.get('claimed')):
+                    if process.exitcode:
+                        print(f"Worker exited with code {process.exitcode}, starting a replacement.")
+                    processes[position] = start_worker(started)
+                    started += 1
+            time.sleep(1)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        queue.close()
+    print(f"Merged {merged}/{total_cells} cells from {started} worker processes.")
     return df
 
 # Function to process each Excel file
-def process_excel_file(input_path, output_path):
+def process_excel_file(input_path, output_path, dry_run=False):
     try:
-        # Read the Excel file and ensure the first row is the header
-        df = pd.read_excel(input_path, header=0)
-        
-        # Remove any formatting and special designs
-        df.columns = df.columns.str.strip()
-        df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-        
-        # Drop columns that do not need to be analyzed
-        # Drop columns that do not need to be analyzed
-        columns_to_exclude = ['Company owner', 'Civilty', 'Contact first name', 'Contact last name', 'Position', 'Comments', '(Hyperline) Assign a subscription link', '(Hyperline) Billing email', '(Hyperline) Create a new invoice link', '(Hyperline) Currency', '(Hyperline) Custom payment delay (in days)', '(Hyperline) Custom tax rate', '(Hyperline) Estimated ARR', '(Hyperline) External ID', '(Hyperline) ID', '(Hyperline) Invoice emails (comma separated)', '(Hyperline) Language', '(Hyperline) Next payment amount', '(Hyperline) Next payment date', '(Hyperline) Open invoices link', '(Hyperline) Open link', '(Hyperline) Open subscriptions link', '(Hyperline) Synchronize', '(Hyperline) Tax number', '(Hyperline) Timezone', 'About Us', 'Annual Revenue', 'Campaign of last booking in meetings tool', 'City', 'Clinic email', 'Close Date', 'Company Domain Name', 'Company Keywords', 'Company name', 'Company Type', 'Corporate group', 'Country/Region', 'Country/Region Code', 'Create Date', 'Created by user ID', 'Date of last meeting booked in meetings tool', 'Days to Close', 'Description', 'Employee range', 'Employees on LinkedIn', 'Existing CT?', 'Facebook Company Page', 'Facebook Fans', 'First Contact Create Date', 'First Conversion', 'First Conversion Date', 'First Deal Created Date', 'First Touch Converting Campaign', 'Founded on', 'Google Plus Page', 'Has been enriched', 'Has Org Chart', 'Headquarter', 'HubSpot Team', 'Ideal Customer Profile Tier', 'Industry', 'Industry group', 'Is Public', 'Last Activity Date', 'Last Booked Meeting Date', 'Last Contacted', 'Last Engagement Date', 'Last Logged Call Date', 'Last Modified Date', 'Last Open Task Date', 'Last Touch Converting Campaign', 'Latest Traffic Source', 'Latest Traffic Source Data 1', 'Latest Traffic Source Data 2', 'Latest Traffic Source Timestamp', 'Lead Status', 'LF MRI / HF MRI / CT Scan', 'Lifecycle Stage', 'LinkedIn Bio', 'LinkedIn Company Page', 'Linkedin handle', 'LinkedIn url', 'Logo URL', 'Medium of last booking in meetings tool', 'Merged Company IDs', 'MRI Field Strength 1', 'MRI Field Strength 2', 'MRI Manufacturer 1', 'MRI Manufacturer 2', 'MRI Model 1', 'MRI Model 2', 'MRI quantity', 'MRI Type', 'MRI?', 'Next Activity Date', 'Number of Associated Contacts', 'Number of Associated Deals', 'Number of blockers', 'Number of child companies', 'Number of Contacts on Org Chart', 'Number of contacts with a buying role', 'Number of decision makers', 'Number of Employees', 'Number of Form Submissions', 'Number of HubSpot Contacts on Org Chart', 'Number of open deals', 'Number of Pageviews', 'Number of Placeholder Contacts on Org Chart', 'Number of Sessions', 'Number of times contacted', 'Org Chart Last Updated At', 'Original Traffic Source', 'Original Traffic Source Drill-Down 1', 'Original Traffic Source Drill-Down 2', 'Owner assigned date', 'Ownership Type', 'PARENT ACCOUNT', 'Parent Company', 'Phone Number', 'Postal Code', 'Practice Type', 'Recent Conversion', 'Recent Conversion Date', 'Recent Deal Amount', 'Recent Deal Close Date', 'Record source', 'Record source detail 1', 'Record source detail 2', 'Record source detail 3', 'Revenue range', 'Size', 'Source of last booking in meetings tool', 'Specialities', 'State/Region', 'Street Address', 'Street Address 2', 'Sync ID', 'Tagline', 'Target Account', 'Time First Seen', 'Time Last Seen', 'Time of First Session', 'Time of Last Session', 'Time Zone', 'Total Money Raised', 'Total open deal value', 'Total Revenue', 'Twitter Bio', 'Twitter Followers', 'Twitter Handle', 'Type', 'Updated by user ID', 'VET/CRO/BIO/MED/Academia (Cloned)', 'Web Technologies', 'Website URL', 'Year Founded', 'Additional Domains']
+        if dry_run:
+            plan = plan_excel_file(input_path)
+            print(f"\nDry run for {input_path}:\n{format_plan(plan)}")
+            return plan
 
-        df = df.drop(columns=columns_to_exclude, errors='ignore')
+        df, weights, identities = load_excel_frame(input_path, ROW_PRIORITIES)
         
-        # Fill missing information
-        df_filled = fill_missing_info(df)
+        # Fill missing information, most valuable cells first and within the run budget
+        run_metrics.reset()
+        budget = RunBudget(max_tokens=RUN_MAX_TOKENS, max_dollars=RUN_MAX_DOLLARS, max_seconds=RUN_MAX_SECONDS)
+        if ENRICHMENT_CONCURRENCY > 1:
+            df_filled = fill_missing_info_sharded(df, weights=weights, budget=budget, identities=identities)
+        else:
+            df_filled = fill_missing_info(df, weights=weights, budget=budget, identities=identities)
+        print(f"\nRun metrics for {input_path}:\n{run_metrics.summary()}")
+        if semantic_cache:
+            semantic_cache.save()
+        negative_cache.save()
+        column_stats.save()
         
         # Save the processed DataFrame to a new Excel file
         df_filled.to_excel(output_path, index=False)
@@ -301,14 +670,24 @@ def select_output_folder():
     folder_selected = filedialog.askdirectory()
     output_folder_var.set(folder_selected)
 
-def start_processing():
+def start_processing(dry_run=False):
     input_folder = input_folder_var.get()
     output_folder = output_folder_var.get()
 
-    if not input_folder or not output_folder:
+    if not input_folder or (not output_folder and not dry_run):
         messagebox.showwarning("Input Required", "Please select both input and output folders.")
         return
 
+    if dry_run:
+        reports = []
+        for filename in os.listdir(input_folder):
+            if (filename.endswith('.xlsx') or filename.endswith('.xls')) and not filename.startswith('~$'):
+                plan = process_excel_file(os.path.join(input_folder, filename), None, dry_run=True)
+                if plan:
+                    reports.append(f"{filename}\n{format_plan(plan)}")
+        messagebox.showinfo("Dry Run", "\n\n".join(reports) or "No Excel files found.")
+        return
+
     # Process all Excel files in the input folder
     for filename in os.listdir(input_folder):
         if (filename.endswith('.xlsx') or filename.endswith('.xls')) and not filename.startswith('~$'):
@@ -321,21 +700,23 @@ def start_processing():
 
     messagebox.showinfo("Processing Complete", "All files have been processed.")
 
-# Set up the GUI
-root = tk.Tk()
-root.title("CRM Data Updater")
+if __name__ == "__main__":
+    # Set up the GUI
+    root = tk.Tk()
+    root.title("CRM Data Updater")
 
-input_folder_var = tk.StringVar()
-output_folder_var = tk.StringVar()
+    input_folder_var = tk.StringVar()
+    output_folder_var = tk.StringVar()
 
-tk.Label(root, text="Select Input Folder:").grid(row=0, column=0, padx=10, pady=10)
-tk.Entry(root, textvariable=input_folder_var, width=50).grid(row=0, column=1)
-tk.Button(root, text="Browse", command=select_input_folder).grid(row=0, column=2, padx=10)
+    tk.Label(root, text="Select Input Folder:").grid(row=0, column=0, padx=10, pady=10)
+    tk.Entry(root, textvariable=input_folder_var, width=50).grid(row=0, column=1)
+    tk.Button(root, text="Browse", command=select_input_folder).grid(row=0, column=2, padx=10)
 
-tk.Label(root, text="Select Output Folder:").grid(row=1, column=0, padx=10, pady=10)
-tk.Entry(root, textvariable=output_folder_var, width=50).grid(row=1, column=1)
-tk.Button(root, text="Browse", command=select_output_folder).grid(row=1, column=2, padx=10)
+    tk.Label(root, text="Select Output Folder:").grid(row=1, column=0, padx=10, pady=10)
+    tk.Entry(root, textvariable=output_folder_var, width=50).grid(row=1, column=1)
+    tk.Button(root, text="Browse", command=select_output_folder).grid(row=1, column=2, padx=10)
 
-tk.Button(root, text="Start Processing", command=start_processing).grid(row=2, column=0, columnspan=3, pady=20)
+    tk.Button(root, text="Dry Run", command=lambda: start_processing(dry_run=True)).grid(row=2, column=0, pady=20)
+    tk.Button(root, text="Start Processing", command=start_processing).grid(row=2, column=1, columnspan=2, pady=20)
 
-root.mainloop()
+    root.mainloop()
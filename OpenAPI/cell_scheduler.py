@@ -0,0 +1,98 @@
+import re
+
+import pandas as pd
+
+
+class RunBudget:
+    """
+    Hard token, dollar and time limits for one enrichment run.
+
+    A limit of None is unbounded. Budgets are checked before each cell,
+    so a run stops with every cell it reached already written.
+    """
+
+    def __init__(self, max_tokens=None, max_dollars=None, max_seconds=None):
+        self.max_tokens = max_tokens
+        self.max_dollars = max_dollars
+        self.max_seconds = max_seconds
+
+    def exhausted(self, metrics):
+        """Return the name of the first exhausted limit, or None."""
+        if self.max_tokens is not None and metrics.tokens >= self.max_tokens:
+            return f"token budget of {self.max_tokens:,}"
+        if self.max_dollars is not None and metrics.dollars >= self.max_dollars:
+            return f"dollar budget of ${self.max_dollars:.2f}"
+        if self.max_seconds is not None and metrics.elapsed_seconds >= self.max_seconds:
+            return f"time budget of {self.max_seconds / 60:.0f} min"
+        return None
+
+    def remaining_seconds(self, metrics):
+        if self.max_seconds is None:
+            return None
+        return max(self.max_seconds - metrics.elapsed_seconds, 0.0)
+
+
+def row_weights(df, row_priorities):
+    """
+    Weight each row by its priority columns (e.g. ICP tier, lead status).
+
+    Args:
+      df: The full sheet, before any columns are dropped.
+      row_priorities: Mapping of column name to {value: weight}; values not
+        listed weigh 1, and the weights of several columns multiply.
+
+    Returns:
+      A Series of weights indexed like df.
+    """
+    weights = pd.Series(1.0, index=df.index)
+    for column, value_weights in row_priorities.items():
+        if column not in df.columns:
+            continue
+        lookup = {str(value).strip().lower(): weight for value, weight in value_weights.items()}
+        weights *= df[column].map(
+            lambda value: lookup.get(str(value).strip().lower(), 1.0) if pd.notna(value) else 1.0
+        )
+    return weights
+
+
+def column_weight(column, column_weights):
+    """
+    Weight of a column: its exact entry, else the first key found as a
+    whole word in its name (case-insensitive), else 1.
+    """
+    if column in column_weights:
+        return column_weights[column]
+    for key, weight in column_weights.items():
+        if re.search(r'\b' + re.escape(key) + r'\b', column, re.IGNORECASE):
+            return weight
+    return 1.0
+
+
+def schedule_cells(df, column_weights, weights=None, column_stats=None):
+    """
+    Order the missing cells of df by expected value, highest first.
+
+    A cell's priority is its column weight (see column_weight) times its
+    row weight, times the column's observed fill rate when there is one.
+    Ties keep sheet order.
+
+    Returns:
+      A list of (row index, column) tuples.
+    """
+    weights_by_column = {column: column_weight(column, column_weights) for column in df.columns}
+    cells = []
+    position = 0
+    for index, row in df.iterrows():
+        row_weight = weights[index] if weights is not None else 1.0
+        for column in df.columns:
+            value = row[column]
+            if pd.isna(value) or value == '':
+                priority = weights_by_column[column] * row_weight
+                if column_stats is not None:
+                    fill_rate = column_stats.fill_rate(column)
+                    if fill_rate is not None:
+                        priority *= fill_rate
+                cells.append((-priority, position, index, column))
+                position += 1
+    cells.sort()
+    return [(index, column) for _, _, index, column in cells]
@@ -0,0 +1,125 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Deadline:
+    """
+    A time budget that can be split into nested stage budgets.
+
+    A stage deadline never outlives its parent, so a per-cell deadline
+    bounds every stage started under it.
+    """
+
+    def __init__(self, seconds, parent=None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.parent = parent
+
+    def remaining(self):
+        """Seconds left, or None when neither this budget nor its parents are bounded."""
+        own = self.expires_at - time.monotonic() if self.expires_at is not None else None
+        inherited = self.parent.remaining() if self.parent is not None else None
+        if own is None:
+            return inherited
+        if inherited is None:
+            return max(own, 0.0)
+        return max(min(own, inherited), 0.0)
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def stage(self, seconds):
+        """Start a child budget of at most `seconds`."""
+        return Deadline(seconds, parent=self)
+
+    def timeout(self, default, minimum=0.5):
+        """A request timeout that respects both `default` and the time left."""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(min(default, remaining), minimum)
+
+
+class LatencyTracker:
+    """Rolling window of fetch latencies used to decide when to hedge."""
+
+    def __init__(self, window=200, min_samples=10, default_p90=5.0):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.default_p90 = default_p90
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def p90(self):
+        if len(self.samples) < self.min_samples:
+            return self.default_p90
+        ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.9) - 1]
+
+
+def fetch_pages_hedged(urls, fetch, deadline, latency_tracker, hedge=True, max_in_flight=2, fetch_timeout=30):
+    """
+    Fetch ranked URLs in order, hedging slow fetches with the next-ranked URL.
+
+    When the oldest fetch in flight passes the tracked p90 latency, the
+    next URL is started alongside it and whichever finishes first is used
+    first. Fetching stops cleanly when the deadline runs out; requests still
+    in flight are abandoned.
+
+    Args:
+      urls: URLs in rank order.
+      fetch: Callable fetch(url, timeout) returning the page HTML or None.
+      deadline: Deadline bounding the whole fetch stage.
+      latency_tracker: LatencyTracker shared across calls.
+      hedge: Start hedged requests for slow fetches.
+      max_in_flight: Maximum number of concurrent fetches when hedging.
+      fetch_timeout: Longest timeout given to a single fetch, in seconds.
+
+    Returns:
+      A list of (url, html) tuples in completion order.
+    """
+    pending = deque(urls)
+    in_flight = {}
+    pages = []
+
+    def timed_fetch(url):
+        started = time.monotonic()
+        html = fetch(url, deadline.timeout(fetch_timeout))
+        latency_tracker.record(time.monotonic() - started)
+        return html
+
+    def launch():
+        url = pending.popleft()
+        in_flight[executor.submit(timed_fetch, url)] = (url, time.monotonic())
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight if hedge else 1)
+    try:
+        while (pending or in_flight) and not deadline.expired():
+            if not in_flight:
+                launch()
+            oldest_started = min(started for _, started in in_flight.values())
+            wait_time = deadline.remaining()
+            can_hedge = hedge and pending and len(in_flight) < max_in_flight
+            if can_hedge:
+                hedge_in = max(latency_tracker.p90() - (time.monotonic() - oldest_started), 0.0)
+                wait_time = hedge_in if wait_time is None else min(wait_time, hedge_in)
+            done, _ = wait(list(in_flight), timeout=wait_time, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, _ = in_flight.pop(future)
+                try:
+                    html = future.result()
+                except Exception as e:
+                    print(f"Error fetching HTML body from {url}: {e}")
+                    html = None
+                if html:
+                    pages.append((url, html))
+            if not done and can_hedge and not deadline.expired():
+                print(f"   Fetch is slower than p90 ({latency_tracker.p90():.1f}s), hedging with the next URL...")
+                launch()
+        if in_flight:
+            print(f"   Fetch deadline reached, abandoning {len(in_flight)} request(s).")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return pages
@@ -0,0 +1,208 @@
+import re
+import time
+import sqlite3
+from urllib.parse import urlparse, unquote
+
+from model_cascade import validate_value
+from row_keys import normalize_domain
+
+# Sites whose pages describe many companies, so their facts are not stored under their own domain
+shared_domains = {
+    'facebook.com', 'linkedin.com', 'twitter.com', 'x.com', 'instagram.com', 'youtube.com',
+    'google.com', 'yelp.com', 'yellowpages.com', 'wikipedia.org', 'bing.com', 'tripadvisor.com',
+    'crunchbase.com', 'bloomberg.com', 'zoominfo.com', 'pagesjaunes.fr', 'apple.com',
+}
+
+social_domains = {
+    'facebook': ('facebook.com', 'fb.com'),
+    'linkedin': ('linkedin.com',),
+    'twitter': ('twitter.com', 'x.com'),
+    'instagram': ('instagram.com',),
+    'youtube': ('youtube.com',),
+}
+
+email_pattern = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+# Fact names looked up for a column, by column name keyword; first match wins.
+# Keywords match as whole words and may only be followed by words that name
+# the form of the value, so 'Kennel capacity' is not a city and 'Hotel phone
+# policy' is not a phone. Country comes before region for 'Country/Region'.
+column_facts = [
+    (('email', 'e-mail'), 'email'),
+    (('fax',), 'fax'),
+    (('phone', 'telephone'), 'phone'),
+    (('street address',), 'street_address'),
+    (('postal', 'zip'), 'postal_code'),
+    (('city',), 'city'),
+    (('country',), 'country'),
+    (('state', 'region'), 'region'),
+    (('facebook',), 'facebook'),
+    (('linkedin',), 'linkedin'),
+    (('twitter',), 'twitter'),
+    (('instagram',), 'instagram'),
+    (('youtube',), 'youtube'),
+    (('logo',), 'logo'),
+    (('year founded', 'founded'), 'founding_date'),
+    (('description', 'about us'), 'description'),
+    (('website', 'domain name'), 'website'),
+    (('company name',), 'name'),
+]
+
+column_tail_words = r"(?:number|no|code|address|url|link|page|handle|profile|name|id|company|main|primary|region|year|date|text)"
+
+column_fact_patterns = [
+    (re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b'
+                r'(?:\W+' + column_tail_words + r'\b)*\W*$', re.IGNORECASE), fact)
+    for keywords, fact in column_facts
+]
+
+
+def column_fact(column):
+    """Return the fact name stored for a column, or None if the column is not covered."""
+    for keywords, fact in column_fact_patterns:
+        if keywords.search(column):
+            return fact
+    return None
+
+
+def _json_ld_items(block):
+    if isinstance(block, list):
+        for item in block:
+            yield from _json_ld_items(item)
+    elif isinstance(block, dict):
+        if '@graph' in block:
+            yield from _json_ld_items(block['@graph'])
+        yield block
+
+
+def _as_text(value):
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('url') or value.get('@id')
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value).strip() if value else None
+
+
+def extract_page_facts(page):
+    """
+    Pull every structured fact we know how to read from a PageDocument.
+
+    Returns:
+      A list of (fact, value) tuples; a fact may appear several times.
+    """
+    facts = []
+    for url, _ in page.links:
+        lower = url.lower()
+        if lower.startswith('mailto:'):
+            facts.append(('email', unquote(url[7:].split('?')[0]).strip()))
+        elif lower.startswith('tel:'):
+            facts.append(('phone', unquote(url[4:]).strip()))
+        else:
+            host = normalize_domain(url) or ''
+            for platform, domains in social_domains.items():
+                if host in domains and urlparse(url).path.strip('/'):
+                    facts.append((platform, url))
+    facts.extend(('email', email) for email in email_pattern.findall(page.text))
+
+    metadata = page.metadata
+    if metadata['meta'].get('description'):
+        facts.append(('description', metadata['meta']['description']))
+    if metadata['meta'].get('og:site_name'):
+        facts.append(('name', metadata['meta']['og:site_name']))
+    for block in metadata['json_ld']:
+        for item in _json_ld_items(block):
+            for key, fact in (('telephone', 'phone'), ('faxNumber', 'fax'), ('email', 'email'),
+                              ('name', 'name'), ('logo', 'logo'), ('foundingDate', 'founding_date'),
+                              ('description', 'description')):
+                value = _as_text(item.get(key))
+                if value:
+                    facts.append((fact, value.replace('mailto:', '')))
+            address = item.get('address')
+            if isinstance(address, dict):
+                for key, fact in (('streetAddress', 'street_address'), ('postalCode', 'postal_code'),
+                                  ('addressLocality', 'city'), ('addressRegion', 'region'),
+                                  ('addressCountry', 'country')):
+                    value = _as_text(address.get(key))
+                    if value:
+                        facts.append((fact, value))
+            for key in ('employee', 'founder', 'member'):
+                people = item.get(key)
+                for person in people if isinstance(people, list) else [people]:
+                    name = _as_text(person)
+                    if name:
+                        facts.append(('staff_name', name))
+            for same_as in item.get('sameAs') or []:
+                host = normalize_domain(same_as) or ''
+                for platform, domains in social_domains.items():
+                    if host in domains:
+                        facts.append((platform, same_as))
+    return facts
+
+
+class EntityStore:
+    """
+    Persistent store of facts about companies, keyed by normalized domain.
+
+    Every fact read from a fetched page is stored with the page URL it came
+    from and when it was recorded, so later columns, rows and exports for
+    the same company can be filled without any network call.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS facts (
+                domain TEXT NOT NULL,
+                fact TEXT NOT NULL,
+                value TEXT NOT NULL,
+                source_url TEXT,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (domain, fact, value)
+            )"""
+        )
+        self.connection.commit()
+
+    def record_fact(self, domain, fact, value, source_url):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO facts (domain, fact, value, source_url, recorded_at) VALUES (?, ?, ?, ?, ?)",
+            (domain, fact, value, source_url, time.time()),
+        )
+
+    def record_page(self, page):
+        """Store every fact found on a page under the page's domain."""
+        domain = normalize_domain(page.url)
+        if not domain or domain in shared_domains:
+            return 0
+        facts = set(extract_page_facts(page))
+        facts.add(('website', domain))
+        try:
+            for fact, value in facts:
+                self.record_fact(domain, fact, value[:2000], page.url)
+            self.connection.commit()
+        except sqlite3.Error as e:
+            print(f"Error recording facts for {domain}: {e}")
+            return 0
+        return len(facts)
+
+    def facts_for(self, domain, fact):
+        """Return (value, source_url, recorded_at) rows for a fact, newest first."""
+        rows = self.connection.execute(
+            "SELECT value, source_url, recorded_at FROM facts WHERE domain = ? AND fact = ? ORDER BY recorded_at DESC",
+            (domain, fact),
+        )
+        return rows.fetchall()
+
+    def lookup(self, domain, column):
+        """Return the most recent known value for a column, or None."""
+        fact = column_fact(column)
+        if not domain or not fact or domain.startswith('name:'):
+            return None
+        for value, source_url, _ in self.facts_for(domain, fact):
+            if validate_value(column, value):
+                print(f"   Found '{column}' for {domain} in entity store (from {source_url})")
+                return value
+        return None
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,119 @@
+import json
+import time
+import sqlite3
+
+
+class JobQueue:
+    """
+    Durable task queue in a local SQLite file, shared by a coordinator and its workers.
+
+    Workers claim tasks with a lease. A task whose lease runs out (because
+    its worker died or hung) is handed to the next worker that asks, up to
+    `max_attempts` times, after which it is marked failed.
+    """
+
+    def __init__(self, path, lease_seconds=600, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                priority REAL NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                merged INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS tasks_run_status ON tasks (run_id, status)")
+
+    def enqueue(self, run_id, payloads):
+        """Add tasks for a run; payloads are (priority, JSON-serializable dict) tuples."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.connection.executemany(
+            "INSERT INTO tasks (run_id, priority, payload) VALUES (?, ?, ?)",
+            [(run_id, priority, json.dumps(payload, default=str)) for priority, payload in payloads],
+        )
+        self.connection.execute("COMMIT")
+
+    def claim(self, run_id, worker):
+        """
+        Claim the highest priority pending or lease-expired task.
+
+        Returns:
+          A (task id, payload) tuple, or None when nothing is claimable.
+        """
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(
+                "UPDATE tasks SET status = 'failed', result = ? WHERE run_id = ? AND status = 'claimed' "
+                "AND claimed_at < ? AND attempts >= ?",
+                (json.dumps({'outcome': 'error', 'error': 'lease expired'}), run_id,
+                 now - self.lease_seconds, self.max_attempts),
+            )
+            row = self.connection.execute(
+                "SELECT id, payload FROM tasks WHERE run_id = ? AND "
+                "(status = 'pending' OR (status = 'claimed' AND claimed_at < ?)) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (run_id, now - self.lease_seconds),
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE tasks SET status = 'claimed', worker = ?, claimed_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (worker, now, row[0]),
+                )
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def complete(self, task_id, worker, result):
+        """Post a task's result; ignored if the lease was taken over by another worker."""
+        self.connection.execute(
+            "UPDATE tasks SET status = 'done', result = ? WHERE id = ? AND worker = ? AND status = 'claimed'",
+            (json.dumps(result, default=str), task_id, worker),
+        )
+
+    def cancel_pending(self, run_id):
+        """Drop tasks nobody has started, e.g. when the run budget is spent."""
+        cursor = self.connection.execute(
+            "UPDATE tasks SET status = 'cancelled' WHERE run_id = ? AND status = 'pending'", (run_id,)
+        )
+        return cursor.rowcount
+
+    def counts(self, run_id):
+        rows = self.connection.execute(
+            "SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status", (run_id,)
+        )
+        return dict(rows.fetchall())
+
+    def take_results(self, run_id):
+        """Return finished tasks not returned before, as (payload, result) tuples."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self.connection.execute(
+                "SELECT id, payload, result FROM tasks WHERE run_id = ? AND merged = 0 "
+                "AND status IN ('done', 'failed') ORDER BY id",
+                (run_id,),
+            ).fetchall()
+            self.connection.executemany("UPDATE tasks SET merged = 1 WHERE id = ?", [(row[0],) for row in rows])
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return [(json.loads(payload), json.loads(result)) for _, payload, result in rows]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,124 @@
+import re
+
+CONFIDENCE_LEVELS = {'low': 0, 'medium': 1, 'high': 2}
+
+confidence_pattern = re.compile(r'\n?\s*Confidence:\s*(high|medium|low)\s*\.?\s*$', re.IGNORECASE)
+
+# Kind of value and format check by column name keyword, matched as whole words,
+# first match wins. Free-text columns (None) come before the count and URL rules,
+# so 'LinkedIn Bio' or 'Twitter Followers' are not checked as links
+phone_pattern = re.compile(r"^\+?[\d\s().-]{7,20}$")
+link_pattern = re.compile(r"^(?:https?://)?(?:[\w-]+\.)+[a-zA-Z]{2,}(?:[/?#]\S*)?$|^@?\w{1,30}$")
+value_patterns = [
+    ('email', ('email', 'e-mail'), re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")),
+    ('fax', ('fax',), phone_pattern),
+    ('phone', ('phone', 'telephone', 'tel', 'mobile'), phone_pattern),
+    ('text', ('name', 'bio', 'description', 'about', 'tagline', 'keywords', 'comments'), None),
+    ('count', ('number of', 'followers', 'fans', 'quantity', 'employees', 'pageviews', 'sessions'),
+     re.compile(r"^[\d,. ]+[kKmM+]?$")),
+    ('year', ('year', 'founded'), re.compile(r"^(?:1[89]|20)\d{2}$")),
+    ('postal', ('postal', 'zip'), re.compile(r"^[A-Za-z0-9 -]{3,10}$")),
+    ('handle', ('handle',), link_pattern),
+    ('url', ('url', 'website', 'domain', 'linkedin', 'facebook', 'twitter', 'page', 'link'), link_pattern),
+]
+column_patterns = [
+    (kind, re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + r')\b', re.IGNORECASE),
+     pattern)
+    for kind, keywords, pattern in value_patterns
+]
+
+
+def column_rule(column):
+    """Return the (kind, pattern) rule for a column name, or (None, None) if no keyword matches."""
+    for kind, keywords, pattern in column_patterns:
+        if keywords.search(column):
+            return kind, pattern
+    return None, None
+
+
+def split_confidence(text):
+    """Split a trailing 'Confidence: <level>' line off a model answer."""
+    if text is None:
+        return None, None
+    match = confidence_pattern.search(text)
+    if not match:
+        return text.strip(), None
+    return text[:match.start()].strip(), match.group(1).lower()
+
+
+def validate_value(column, value):
+    """Check an extracted value against the expected format for its column."""
+    if not value:
+        return False
+    if value.lower() == 'not found':
+        return True
+    if len(value) > 300 or '\n' in value.strip():
+        return False
+    _, pattern = column_rule(column)
+    return pattern is None or bool(pattern.match(value.strip()))
+
+
+def validate_query(query):
+    """Check that a generated search query is a single, short line."""
+    if not query:
+        return False
+    query = query.strip()
+    return '\n' not in query and 0 < len(query.split()) <= 32
+
+
+def estimate_tokens(messages):
+    """Rough prompt token count (about four characters per token)."""
+    return sum(len(message['content']) for message in messages) // 4 + 4 * len(messages)
+
+
+def run_cascade(client, models, messages, validate, min_confidence='medium',
+                escalate_on_not_found=False, deadline=None, request_timeout=30, limiter=None, on_completion=None, **params):
+    """
+    Try each model in order until one returns an acceptable answer.
+
+    An answer is acceptable when it passes `validate`, its reported
+    confidence (if any) is at least `min_confidence`, and, when
+    `escalate_on_not_found` is set, it is not 'Not found'. The last
+    model's answer is returned even if it fails the checks. When a
+    `deadline` is given, no further model is tried once it has expired.
+    When a `limiter` is given, each call first takes its request and
+    estimated token cost from the shared per-model quota. `on_completion`
+    is called with (model, completion) after every successful call.
+
+    Returns:
+      A tuple (answer, confidence, model), or (None, None, None) if every call failed.
+    """
+    best = (None, None, None)
+    for position, model in enumerate(models):
+        is_last = position == len(models) - 1
+        if deadline is not None and deadline.expired():
+            print(f"   Deadline reached before calling {model}.")
+            break
+        if limiter is not None:
+            estimated_tokens = estimate_tokens(messages) + params.get('max_tokens', 0)
+            if not (limiter.acquire('openai', f'chat.completions/{model}', deadline=deadline) and
+                    limiter.acquire('openai', f'chat.tokens/{model}', cost=estimated_tokens, deadline=deadline)):
+                break
+        timeout = deadline.timeout(request_timeout) if deadline is not None else request_timeout
+        try:
+            completion = client.chat.completions.create(model=model, messages=messages, timeout=timeout, **params)
+        except Exception as e:
+            print(f"   Error calling {model}: {e}")
+            continue
+        if on_completion is not None:
+            on_completion(model, completion)
+        answer, confidence = split_confidence(completion.choices[0].message.content)
+        best = (answer, confidence, model)
+        if is_last:
+            break
+        if not validate(answer):
+            print(f"   {model} answer failed validation, escalating...")
+            continue
+        if confidence is not None and CONFIDENCE_LEVELS[confidence] < CONFIDENCE_LEVELS[min_confidence]:
+            print(f"   {model} reported {confidence} confidence, escalating...")
+            continue
+        if escalate_on_not_found and answer.lower() == 'not found':
+            print(f"   {model} found nothing, escalating...")
+            continue
+        break
+    return best
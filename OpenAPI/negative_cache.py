@@ -0,0 +1,120 @@
+import os
+import json
+import time
+
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return default
+
+
+def _save_json(path, data):
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error saving {path}: {e}")
+
+
+class NegativeResultCache:
+    """
+    Persistent record of "Not found" outcomes per (entity, column).
+
+    A cell whose entity/column pair came back empty less than `ttl_seconds`
+    ago is skipped instead of paying for another search, fetch and extract.
+    """
+
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.entries = _load_json(path, {})
+        self._purge_expired()
+
+    @staticmethod
+    def _key(entity, column):
+        return f"{entity}\t{column}"
+
+    def _purge_expired(self):
+        now = time.time()
+        self.entries = {
+            key: recorded_at for key, recorded_at in self.entries.items()
+            if now - recorded_at < self.ttl_seconds
+        }
+
+    def is_known_missing(self, entity, column):
+        """Return True if the pair was recorded as not found within the TTL."""
+        if not entity:
+            return False
+        recorded_at = self.entries.get(self._key(entity, column))
+        return recorded_at is not None and time.time() - recorded_at < self.ttl_seconds
+
+    def record_missing(self, entity, column):
+        if entity:
+            self.entries[self._key(entity, column)] = time.time()
+
+    def clear(self, entity, column):
+        self.entries.pop(self._key(entity, column), None)
+
+    def save(self):
+        self._purge_expired()
+        _save_json(self.path, self.entries)
+
+
+class ColumnFillStats:
+    """
+    Running fill-rate statistics per column.
+
+    Columns with at least `min_attempts` attempts and a fill rate below
+    `min_fill_rate` are skipped, except for one probe attempt every
+    `probe_every` skips so a column can recover if it starts filling.
+    """
+
+    def __init__(self, path, min_fill_rate=0.05, min_attempts=20, probe_every=25):
+        self.path = path
+        self.min_fill_rate = min_fill_rate
+        self.min_attempts = min_attempts
+        self.probe_every = probe_every
+        self.stats = _load_json(path, {})
+
+    def _column_stats(self, column):
+        return self.stats.setdefault(column, {'attempts': 0, 'filled': 0, 'skipped': 0})
+
+    def fill_rate(self, column):
+        """Return the observed fill rate, or None if the column has no history."""
+        stats = self.stats.get(column)
+        if not stats or not stats['attempts']:
+            return None
+        return stats['filled'] / stats['attempts']
+
+    def record(self, column, filled):
+        stats = self._column_stats(column)
+        stats['attempts'] += 1
+        if filled:
+            stats['filled'] += 1
+
+    def is_below_threshold(self, column):
+        """Return True if the column has enough history and fills too rarely."""
+        stats = self.stats.get(column)
+        if not stats or stats['attempts'] < self.min_attempts:
+            return False
+        return self.fill_rate(column) < self.min_fill_rate
+
+    def should_skip(self, column):
+        """Return True if the column is below the configured success rate."""
+        if not self.is_below_threshold(column):
+            return False
+        stats = self.stats[column]
+        stats['skipped'] += 1
+        return stats['skipped'] % self.probe_every != 0
+
+    def save(self):
+        _save_json(self.path, self.stats)
@@ -0,0 +1,165 @@
+import re
+import json
+from functools import cached_property
+from urllib.parse import urljoin, urlparse, unquote
+
+# lxml is much faster; BeautifulSoup's html.parser is the fallback when it is not installed
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+    from bs4 import BeautifulSoup
+
+skipped_text_tags = ('script', 'style', 'noscript', 'template', 'svg')
+
+# lxml refuses str input that starts with an encoding declaration; the HTML is already decoded
+xml_declaration_pattern = re.compile(r'^\ufeff?\s*<\?xml[^>]*\?>')
+
+text_xpath = './/text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template or ancestor::svg)]'
+
+
+def _clean_text(parts):
+    return re.sub(r'\s+', ' ', ' '.join(parts)).strip()
+
+
+class PageDocument:
+    """
+    A fetched page, parsed once and shared by every consumer.
+
+    The HTML is parsed on first access, and text, links, images and
+    metadata are each computed lazily from that single parse tree.
+    """
+
+    def __init__(self, url, html):
+        self.url = url
+        self.html = html or ''
+
+    @cached_property
+    def tree(self):
+        if lxml is not None:
+            try:
+                html = xml_declaration_pattern.sub('', self.html, count=1)
+                return lxml.html.fromstring(html) if html.strip() else None
+            except Exception as e:
+                print(f"Error parsing HTML from {self.url}: {e}")
+                return None
+        return BeautifulSoup(self.html, 'html.parser')
+
+    def _find(self, tag):
+        if self.tree is None:
+            return None
+        if lxml is not None:
+            found = self.tree.xpath(f'//{tag}')
+            return found[0] if found else None
+        return self.tree.find(tag)
+
+    def _text_of(self, node):
+        if node is None:
+            return ''
+        if lxml is not None:
+            return _clean_text(node.xpath(text_xpath))
+        return _clean_text(
+            string for string in node.find_all(string=True)
+            if not any(parent.name in skipped_text_tags for parent in string.parents)
+        )
+
+    @cached_property
+    def text(self):
+        """All visible text of the page body, whitespace collapsed."""
+        body = self._find('body')
+        return self._text_of(body if body is not None else self.tree)
+
+    @cached_property
+    def main_text(self):
+        """Text of the <main> or <article> region, or the whole body text."""
+        for tag in ('main', 'article'):
+            node = self._find(tag)
+            if node is not None:
+                text = self._text_of(node)
+                if text:
+                    return text
+        return self.text
+
+    @cached_property
+    def links(self):
+        """List of (absolute URL, anchor text) pairs for every <a href>."""
+        if self.tree is None:
+            return []
+        links = []
+        if lxml is not None:
+            anchors = ((a.get('href'), a.text_content()) for a in self.tree.iter('a'))
+        else:
+            anchors = ((a.get('href'), a.get_text(' ')) for a in self.tree.find_all('a'))
+        for href, anchor_text in anchors:
+            if href and not href.startswith(('javascript:', '#')):
+                links.append((urljoin(self.url, href.strip()), _clean_text([anchor_text or ''])))
+        return links
+
+    @cached_property
+    def contact_links(self):
+        """
+        mailto:, tel: and off-site link targets, as 'anchor text: target' lines.
+
+        These live in href attributes, so they are missing from `text`.
+        """
+        host = urlparse(self.url).hostname or ''
+        lines = []
+        seen = set()
+        for url, anchor_text in self.links:
+            if url.lower().startswith(('mailto:', 'tel:', 'fax:')):
+                target = unquote(url.split(':', 1)[1].split('?')[0]).strip()
+            elif url.lower().startswith(('http://', 'https://')) and urlparse(url).hostname not in (None, host):
+                target = url
+            else:
+                continue
+            if target and target not in seen:
+                seen.add(target)
+                lines.append(f"{anchor_text}: {target}" if anchor_text else target)
+        return lines
+
+    @cached_property
+    def images(self):
+        """List of absolute image URLs, in page order."""
+        if self.tree is None:
+            return []
+        if lxml is not None:
+            sources = (img.get('src') for img in self.tree.iter('img'))
+        else:
+            sources = (img.get('src') for img in self.tree.find_all('img'))
+        return [urljoin(self.url, src.strip()) for src in sources if src]
+
+    @cached_property
+    def metadata(self):
+        """Title, meta name/property contents, canonical URL and JSON-LD blocks."""
+        metadata = {'title': '', 'meta': {}, 'canonical': None, 'json_ld': []}
+        if self.tree is None:
+            return metadata
+        if lxml is not None:
+            title = self._find('title')
+            metadata['title'] = _clean_text([title.text_content()]) if title is not None else ''
+            metas = self.tree.iter('meta')
+            link_tags = self.tree.iter('link')
+            scripts = self.tree.xpath('//script[@type="application/ld+json"]')
+            script_texts = [script.text or '' for script in scripts]
+        else:
+            title = self.tree.find('title')
+            metadata['title'] = _clean_text([title.get_text(' ')]) if title is not None else ''
+            metas = self.tree.find_all('meta')
+            link_tags = self.tree.find_all('link')
+            scripts = self.tree.find_all('script', attrs={'type': 'application/ld+json'})
+            script_texts = [script.string or '' for script in scripts]
+        for meta in metas:
+            key = meta.get('name') or meta.get('property')
+            if key and meta.get('content'):
+                metadata['meta'][key.lower()] = meta.get('content').strip()
+        for link in link_tags:
+            rel = link.get('rel')
+            rel = ' '.join(rel) if isinstance(rel, list) else (rel or '')
+            if 'canonical' in rel.lower() and link.get('href'):
+                metadata['canonical'] = urljoin(self.url, link.get('href'))
+        for script_text in script_texts:
+            try:
+                metadata['json_ld'].append(json.loads(script_text))
+            except ValueError:
+                continue
+        return metadata
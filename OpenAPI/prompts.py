@@ -0,0 +1,73 @@
+from model_cascade import column_rule
+
+# Prompt layout: everything that is the same for every cell of a file (instructions and the
+# column schema) goes first, the per-cell content (row context, page text, missing column)
+# always comes last.
+#
+# OpenAI caches a prompt prefix only once it reaches 1,024 tokens, which the extraction prefix
+# does on sheets with many columns. The guidelines are kept to what improves the answers; they
+# are not padded to reach that minimum, since the padding would cost more than caching saves.
+
+QUERY_INSTRUCTIONS = """You are a helpful assistant that writes web search queries for a CRM enrichment tool.
+You are given the known fields of one company row and the name of one missing column.
+Write one concise search query that is most likely to find the value of the missing column.
+Use the company name, location and domain when they are known.
+Reply with the search query only, on a single line, without quotes or explanations."""
+
+EXTRACTION_INSTRUCTIONS = """You are a helpful assistant that extracts values for a CRM enrichment tool.
+You are given web page content and image descriptions found for one company, and the name of one missing column.
+Extract the value of the missing column from the content. If the information is not found, reply with 'Not found'.
+Reply with the value only, then on a new line write 'Confidence: high', 'Confidence: medium' or 'Confidence: low'."""
+
+EXTRACTION_GUIDELINES = """Guidelines:
+- Each page is followed by a 'Links on <url>:' line with the email addresses, phone numbers and links in its hyperlinks.
+- Prefer the company's own website to directories, review sites and social networks. Use a listing only when it
+  clearly describes the same company (same name, and same city when known).
+- Ignore values of other companies on the page (partners, suppliers, the web agency) and of cookie banners or footers.
+- Reply with one value exactly as it should be stored: no labels, quotes or explanations. Prefer the main office and
+  general contact point to a named employee, branch or booking platform. Never combine or invent values.
+- Phone and fax numbers in international format with the country code; do not give a fax number for a phone column
+  or the other way round. Emails in lowercase without 'mailto:'. Social profiles as the full URL of the company's
+  own profile. Years only when the content states them, not computed from 'over 25 years'.
+- Yes/no columns: 'Yes' or 'No' only when the content says so explicitly.
+- Reply 'Not found' rather than a value that may be wrong or belong to another company.
+- Confidence is high when the company's own pages state the value, medium for a single matching listing or a
+  reformatted value, and low when the match is uncertain or candidates disagree."""
+
+# Format hints by kind of column, using model_cascade's whole-word column rules
+format_hints = {
+    'email': 'a single email address',
+    'fax': 'a fax number including the country code',
+    'phone': 'a phone number including the country code',
+    'count': 'a number',
+    'year': 'a four digit year',
+    'handle': 'a handle such as @name',
+    'url': 'a full URL',
+}
+
+
+def build_column_schema(headers):
+    """Describe every column of the sheet, with format hints where we have them."""
+    lines = ["Columns of the sheet:"]
+    for header in headers:
+        kind, _ = column_rule(header)
+        hint = format_hints.get(kind)
+        lines.append(f"- {header}" + (f" ({hint})" if hint else ''))
+    return '\n'.join(lines)
+
+
+def query_messages(schema, missing_column, context):
+    return [
+        {"role": "system", "content": f"{QUERY_INSTRUCTIONS}\n\n{schema}"},
+        {"role": "user", "content": f"Known fields:\n{context}\nMissing column: {missing_column}\n\nSearch Query:"},
+    ]
+
+
+def extraction_messages(schema, missing_column, combined_text):
+    return [
+        {"role": "system", "content": f"{EXTRACTION_INSTRUCTIONS}\n\n{EXTRACTION_GUIDELINES}\n\n{schema}"},
+        {"role": "user", "content": (
+            f"Web Content and Image Descriptions:\n{combined_text}\n\n"
+            f"Missing column: {missing_column}\n\n{missing_column}:"
+        )},
+    ]
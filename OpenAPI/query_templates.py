@@ -0,0 +1,70 @@
+import re
+import json
+
+import pandas as pd
+
+placeholder_pattern = re.compile(r'\{([^{}]+)\}')
+
+
+def load_query_templates(path):
+    """
+    Load per-column search query templates from a JSON file.
+
+    The file holds a "default" list of templates and a "columns" mapping
+    from a column name, or a keyword found as a whole word in column names
+    (e.g. "phone" for "Clinic Phone"), to its own list. Placeholders name
+    row columns, including the identity columns kept after the drop, e.g.
+    "{Company name} {City} phone number"; "{column}" is the missing column.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            templates = json.load(f)
+    except FileNotFoundError:
+        print(f"Query template file not found at {path}, using generated queries only.")
+        return {'default': [], 'columns': {}}
+    except Exception as e:
+        print(f"Error loading query templates: {e}")
+        return {'default': [], 'columns': {}}
+    templates.setdefault('default', [])
+    templates.setdefault('columns', {})
+    return templates
+
+
+def _field_value(row_data, field):
+    value = row_data.get(field)
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def column_templates(missing_column, templates):
+    """Templates for a column: its exact entry first, then the entries of keywords in its name."""
+    columns = templates['columns']
+    candidates = list(columns.get(missing_column, []))
+    for key, key_templates in columns.items():
+        if key != missing_column and re.search(r'\b' + re.escape(key) + r'\b', missing_column, re.IGNORECASE):
+            candidates += key_templates
+    return candidates
+
+
+def build_templated_query(missing_column, row_data, templates):
+    """
+    Build a search query from the first template whose fields are all present.
+
+    Column-specific templates are tried before the defaults. Returns None
+    when no template can be completed from the row.
+    """
+    candidates = column_templates(missing_column, templates) + templates['default']
+    for template in candidates:
+        query = template
+        complete = True
+        for field in placeholder_pattern.findall(template):
+            value = missing_column if field == 'column' else _field_value(row_data, field)
+            if field == missing_column or value is None:
+                complete = False
+                break
+            query = query.replace('{' + field + '}', value)
+        if complete:
+            return re.sub(r'\s+', ' ', query).strip()
+    return None
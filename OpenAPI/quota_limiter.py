@@ -0,0 +1,85 @@
+import time
+import random
+import sqlite3
+
+
+class QuotaLimiter:
+    """
+    Token-bucket API quota shared by every process on this machine.
+
+    Bucket state lives in a SQLite file, and each acquire runs inside an
+    immediate (write-locked) transaction, so concurrent CRMauto processes
+    using the same keys draw from one budget per (provider, endpoint)
+    instead of each throttling on its own.
+
+    Args:
+      path: SQLite file shared by all processes.
+      limits: Mapping of (provider, endpoint) to (units per second, burst size).
+        Calls for a pair without a configured limit are never throttled.
+    """
+
+    def __init__(self, path, limits):
+        self.path = path
+        self.limits = limits
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS buckets (
+                bucket TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def _take(self, bucket, rate, burst, cost):
+        """Try to take `cost` units; return 0 on success or the seconds to wait."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = self.connection.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE bucket = ?", (bucket,)
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait_seconds = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait_seconds = (cost - tokens) / rate
+            self.connection.execute(
+                "INSERT OR REPLACE INTO buckets (bucket, tokens, updated_at) VALUES (?, ?, ?)",
+                (bucket, tokens, now),
+            )
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return wait_seconds
+
+    def acquire(self, provider, endpoint, cost=1, deadline=None):
+        """
+        Block until `cost` units are available for (provider, endpoint).
+
+        Returns False if the deadline runs out first, True otherwise.
+        """
+        limit = self.limits.get((provider, endpoint))
+        if limit is None:
+            return True
+        rate, burst = limit
+        # A request bigger than the bucket could never be served, so cap it at the burst size
+        cost = min(cost, burst)
+        bucket = f"{provider}/{endpoint}"
+        while True:
+            try:
+                wait_seconds = self._take(bucket, rate, burst, cost)
+            except sqlite3.Error as e:
+                print(f"Error reading API quota for {bucket}: {e}")
+                return True
+            if wait_seconds <= 0:
+                return True
+            # A little jitter keeps waiting processes from retrying in lockstep
+            wait_seconds += random.uniform(0, 0.05)
+            if deadline is not None:
+                remaining = deadline.remaining()
+                if remaining is not None and remaining < wait_seconds:
+                    print(f"   Deadline reached while waiting for {bucket} quota.")
+                    return False
+            time.sleep(wait_seconds)
@@ -0,0 +1,85 @@
+import re
+from urllib.parse import urlparse
+
+import pandas as pd
+
+# Columns that identify the company behind a row, in order of preference
+DOMAIN_COLUMNS = ['Company Domain Name', 'Website URL', 'Additional Domains']
+NAME_COLUMNS = ['Company name', 'Name']
+# Columns kept with each row for keys and search queries, even when the sheet drops them
+IDENTITY_COLUMNS = DOMAIN_COLUMNS + NAME_COLUMNS + ['City', 'State/Region', 'Country/Region', 'Street Address']
+
+
+def normalize_domain(value):
+    """
+    Normalize a URL or bare domain to its lowercase host without 'www.'.
+
+    Returns None when the value does not look like a domain.
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    value = str(value).strip().lower()
+    if not value:
+        return None
+    # Only the first domain of a comma separated list is used
+    value = value.split(',')[0].strip()
+    if '//' not in value:
+        value = '//' + value
+    host = urlparse(value).hostname or ''
+    host = re.sub(r'^www\d*\.', '', host).rstrip('.')
+    if '.' not in host:
+        return None
+    return host
+
+
+def entity_key(row_data):
+    """
+    Build a stable key for the company behind a row.
+
+    The normalized domain is preferred, then the lowercased company name.
+    Returns None when the row has neither.
+    """
+    for column in DOMAIN_COLUMNS:
+        domain = normalize_domain(row_data.get(column))
+        if domain:
+            return domain
+    for column in NAME_COLUMNS:
+        name = row_data.get(column)
+        if isinstance(name, str) and name.strip():
+            return 'name:' + re.sub(r'\s+', ' ', name.strip().lower())
+    return None
+
+
+def row_identities(df):
+    """
+    Read the identity columns of each row.
+
+    Args:
+      df: The full sheet, before any columns are dropped.
+
+    Returns:
+      A dict mapping each row index to its filled identity columns.
+    """
+    columns = [column for column in IDENTITY_COLUMNS if column in df.columns]
+    identities = {}
+    for index, row in df[columns].iterrows():
+        identities[index] = {
+            column: value for column, value in row.items() if pd.notna(value) and value != ''
+        }
+    return identities
+
+
+def row_record(df, index, identities=None):
+    """Return a row as a dict, with its identity columns added back from `identities`."""
+    row_data = dict(identities.get(index, {})) if identities else {}
+    row_data.update(df.loc[index].to_dict())
+    return row_data
+
+
+def build_row_context(missing_column, row_data):
+    """Join the row's filled columns, except the missing one, as 'column: value' lines."""
+    context = ''
+    for col, val in row_data.items():
+        if col != missing_column and pd.notna(val) and val != '':
+            context += f"{col}: {val}\n"
+    return context
@@ -0,0 +1,87 @@
+import time
+
+from run_planner import MODEL_PRICES, SEARCH_PRICES
+
+# Share of the input price charged for prompt tokens served from the provider's prefix cache
+CACHED_INPUT_PRICE_FACTOR = 0.5
+
+
+class RunMetrics:
+    """Counts the calls, tokens, dollars and time spent by one enrichment run."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started_at = time.monotonic()
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.llm_dollars = 0.0
+        self.searches = 0
+        self.page_fetches = 0
+        self.image_lookups = 0
+        self.cells_attempted = 0
+        self.cells_filled = 0
+
+    def snapshot(self):
+        """Counters that workers report back to the coordinator."""
+        return {
+            'llm_calls': self.llm_calls,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cached_tokens': self.cached_tokens,
+            'llm_dollars': self.llm_dollars,
+            'searches': self.searches,
+            'page_fetches': self.page_fetches,
+            'image_lookups': self.image_lookups,
+        }
+
+    def merge(self, before, after):
+        """Add the difference between two worker snapshots."""
+        for name, value in after.items():
+            setattr(self, name, getattr(self, name) + value - before.get(name, 0))
+
+    def record_completion(self, model, completion):
+        """Add the token usage of a chat completion."""
+        self.llm_calls += 1
+        usage = getattr(completion, 'usage', None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (getattr(details, 'cached_tokens', 0) or 0) if details is not None else 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cached_tokens += cached_tokens
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        input_cost = (prompt_tokens - cached_tokens + cached_tokens * CACHED_INPUT_PRICE_FACTOR) * input_price
+        self.llm_dollars += (input_cost + completion_tokens * output_price) / 1_000_000
+
+    @property
+    def cached_share(self):
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    @property
+    def tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    @property
+    def dollars(self):
+        return (self.llm_dollars + self.searches * SEARCH_PRICES['web.search'] +
+                self.image_lookups * SEARCH_PRICES['images.visualsearch'])
+
+    @property
+    def elapsed_seconds(self):
+        return time.monotonic() - self.started_at
+
+    def summary(self):
+        return (
+            f"Cells filled: {self.cells_filled}/{self.cells_attempted} attempted\n"
+            f"LLM calls: {self.llm_calls}, tokens: {self.prompt_tokens:,} prompt "
+            f"({self.cached_tokens:,} cached, {self.cached_share:.0%}), {self.completion_tokens:,} completion\n"
+            f"Searches: {self.searches}, page fetches: {self.page_fetches}, image lookups: {self.image_lookups}\n"
+            f"Cost: ${self.dollars:.2f}, time: {self.elapsed_seconds / 60:.1f} min"
+        )
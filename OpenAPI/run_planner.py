@@ -0,0 +1,179 @@
+import pandas as pd
+
+from row_keys import entity_key, build_row_context, row_record
+from query_templates import build_templated_query
+from prompts import build_column_schema, extraction_messages
+from model_cascade import estimate_tokens
+
+# USD per million tokens as (input, output)
+MODEL_PRICES = {
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-3.5-turbo': (0.50, 1.50),
+}
+
+# USD per call
+SEARCH_PRICES = {
+    'web.search': 0.015,
+    'images.visualsearch': 0.015,
+}
+
+# Average behaviour of one enrichment, used when nothing better is known
+DEFAULT_ESTIMATES = {
+    'urls_per_search': 10,
+    'fetch_success_rate': 0.8,
+    'images_per_page': 3,
+    'page_text_chars': 8000,
+    'escalation_rate': 0.25,      # Share of cascade calls that move up to the next model
+    'template_miss_rate': 0.2,    # Share of templated searches that return nothing
+    'search_retry_rate': 0.1,     # Share of generated-query searches that are retried
+    'query_prompt_tokens': 400,
+    'query_completion_tokens': 20,
+    'extraction_completion_tokens': 40,
+    'llm_seconds': 2.0,
+    'search_seconds': 1.0,
+    'fetch_seconds': 1.5,
+    'image_seconds': 2.5,         # Download, visual search and the politeness pause
+}
+
+
+def is_missing(value):
+    return pd.isna(value) or value == ''
+
+
+def _cascade_calls(models, escalation_rate):
+    """Expected number of calls to each model in a cascade."""
+    calls = {}
+    reach = 1.0
+    for model in models:
+        calls[model] = calls.get(model, 0.0) + reach
+        reach *= escalation_rate
+    return calls
+
+
+def plan_run(df, query_templates, query_models, extraction_models, max_content_chars,
+             cell_deadline_seconds, concurrency=1, entity_store=None, negative_cache=None,
+             column_stats=None, semantic_cache=None, estimates=None, identities=None):
+    """
+    Build the missing-cell plan for a DataFrame without calling any API.
+
+    Cells answered by the entity store or semantic cache, or skipped by the
+    negative cache or column fill rates, are not counted as work; these are
+    the checks fill_cell makes, in the same order, as they stand before the
+    run. Everything else is costed with the average estimates. `identities` holds each row's
+    identity columns read before the sheet's columns were dropped.
+
+    Returns:
+      A dict with cell counts, expected calls, tokens, dollars and seconds.
+    """
+    estimates = dict(DEFAULT_ESTIMATES, **(estimates or {}))
+    plan = {
+        'missing_cells': 0, 'entity_store_hits': 0, 'semantic_cache_hits': 0,
+        'negative_cache_skips': 0, 'low_fill_rate_skips': 0, 'cells_to_enrich': 0,
+        'templated_queries': 0, 'llm_calls': 0.0, 'searches': 0.0, 'page_fetches': 0.0,
+        'image_lookups': 0.0, 'prompt_tokens': 0.0, 'completion_tokens': 0.0,
+        'llm_dollars': 0.0, 'search_dollars': 0.0, 'total_dollars': 0.0,
+        'serial_seconds': 0.0, 'wall_clock_seconds': 0.0, 'concurrency': concurrency,
+    }
+    model_tokens = {}
+
+    def charge(models, prompt_tokens, completion_tokens, share=1.0):
+        """Add the expected cascade calls for `share` of a cell; return the call count."""
+        total_calls = 0.0
+        for model, calls in _cascade_calls(models, estimates['escalation_rate']).items():
+            calls *= share
+            total_calls += calls
+            tokens = model_tokens.setdefault(model, [0.0, 0.0])
+            tokens[0] += calls * prompt_tokens
+            tokens[1] += calls * completion_tokens
+        plan['llm_calls'] += total_calls
+        return total_calls
+
+    # Instructions, guidelines and column schema sent with every extraction
+    extraction_prefix_tokens = estimate_tokens(extraction_messages(build_column_schema(df.columns.tolist()), '', ''))
+
+    # Skips per low fill rate column; like should_skip, every probe_every-th one is attempted
+    skipped = {}
+    for index, row in df.iterrows():
+        row_data = row_record(df, index, identities)
+        entity = entity_key(row_data)
+        for column in df.columns:
+            if not is_missing(row[column]):
+                continue
+            plan['missing_cells'] += 1
+            if entity_store is not None and entity_store.lookup(entity, column):
+                plan['entity_store_hits'] += 1
+                continue
+            if negative_cache is not None and negative_cache.is_known_missing(entity, column):
+                plan['negative_cache_skips'] += 1
+                continue
+            if column_stats is not None and column_stats.is_below_threshold(column):
+                skipped[column] = skipped.get(column, column_stats.stats[column]['skipped']) + 1
+                if skipped[column] % column_stats.probe_every != 0:
+                    plan['low_fill_rate_skips'] += 1
+                    continue
+            if semantic_cache is not None:
+                if semantic_cache.lookup(column, build_row_context(column, row_data), audit=False):
+                    plan['semantic_cache_hits'] += 1
+                    continue
+
+            plan['cells_to_enrich'] += 1
+            seconds = 0.0
+
+            # Query: templated search first, generated query when no template applies or it misses
+            if build_templated_query(column, row_data, query_templates):
+                plan['templated_queries'] += 1
+                plan['searches'] += 1
+                seconds += estimates['search_seconds']
+                generated_share = estimates['template_miss_rate']
+            else:
+                generated_share = 1.0
+            query_calls = charge(query_models, estimates['query_prompt_tokens'],
+                                 estimates['query_completion_tokens'], share=generated_share)
+            searches = generated_share * (1 + estimates['search_retry_rate'])
+            plan['searches'] += searches
+            seconds += query_calls * estimates['llm_seconds'] + searches * estimates['search_seconds']
+
+            # Fetch, images and extraction
+            fetches = estimates['urls_per_search']
+            pages = fetches * estimates['fetch_success_rate']
+            images = pages * estimates['images_per_page']
+            plan['page_fetches'] += fetches
+            plan['image_lookups'] += images
+            prompt_chars = min(pages * estimates['page_text_chars'], max_content_chars)
+            extraction_calls = charge(extraction_models, prompt_chars / 4 + extraction_prefix_tokens,
+                                      estimates['extraction_completion_tokens'])
+            seconds += (fetches * estimates['fetch_seconds'] + images * estimates['image_seconds'] +
+                        extraction_calls * estimates['llm_seconds'])
+            plan['serial_seconds'] += min(seconds, cell_deadline_seconds)
+
+    for model, (prompt_tokens, completion_tokens) in model_tokens.items():
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        plan['prompt_tokens'] += prompt_tokens
+        plan['completion_tokens'] += completion_tokens
+        plan['llm_dollars'] += (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    plan['search_dollars'] = (plan['searches'] * SEARCH_PRICES['web.search'] +
+                              plan['image_lookups'] * SEARCH_PRICES['images.visualsearch'])
+    plan['total_dollars'] = plan['llm_dollars'] + plan['search_dollars']
+    plan['wall_clock_seconds'] = plan['serial_seconds'] / max(concurrency, 1)
+    return plan
+
+
+def format_plan(plan):
+    """Human readable summary of a plan."""
+    hours, remainder = divmod(int(plan['wall_clock_seconds']), 3600)
+    minutes = remainder // 60
+    return (
+        f"Missing cells: {plan['missing_cells']}\n"
+        f"  from entity store: {plan['entity_store_hits']}, from semantic cache: {plan['semantic_cache_hits']}\n"
+        f"  skipped as not found: {plan['negative_cache_skips']}, low fill rate: {plan['low_fill_rate_skips']}\n"
+        f"  to enrich: {plan['cells_to_enrich']} ({plan['templated_queries']} with templated queries)\n"
+        f"LLM calls: {plan['llm_calls']:.0f}\n"
+        f"Searches: {plan['searches']:.0f}\n"
+        f"Page fetches: {plan['page_fetches']:.0f}\n"
+        f"Image lookups: {plan['image_lookups']:.0f}\n"
+        f"Tokens: {plan['prompt_tokens']:,.0f} prompt, {plan['completion_tokens']:,.0f} completion\n"
+        f"Estimated cost: ${plan['total_dollars']:.2f} "
+        f"(LLM ${plan['llm_dollars']:.2f}, search ${plan['search_dollars']:.2f})\n"
+        f"Estimated time: {hours}h {minutes:02d}m at concurrency {plan['concurrency']}"
+    )
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+
+# Optional dependencies - the cache switches itself off when they are missing
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = None
+    SentenceTransformer = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+class SemanticCache:
+    """
+    Near-duplicate answer cache for the CRM filler.
+
+    Every successful extraction is stored under an embedding of its
+    (column, row context) pair. A later cell whose embedding is close
+    enough (cosine similarity >= threshold) for the same column reuses the
+    earlier answer instead of searching again. Every such hit is appended
+    to the audit log so it can be reviewed afterwards.
+    """
+
+    def __init__(self, cache_dir, model_name='all-MiniLM-L6-v2', threshold=0.92,
+                 audit_log_path=None, max_elements=100000, neighbours=5):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.threshold = threshold
+        self.audit_log_path = audit_log_path or os.path.join(cache_dir, 'semantic_hits.jsonl')
+        self.max_elements = max_elements
+        self.neighbours = neighbours
+        self.entries = []
+        self.vectors = None
+        self.index = None
+        self.model = None
+        self.enabled = np is not None and SentenceTransformer is not None
+        if not self.enabled:
+            print("Semantic cache disabled: install numpy and sentence-transformers to use it.")
+            return
+        self.model = SentenceTransformer(model_name)
+        self.load()
+
+    def _entries_path(self):
+        return os.path.join(self.cache_dir, 'entries.json')
+
+    def _vectors_path(self):
+        return os.path.join(self.cache_dir, 'vectors.npy')
+
+    @staticmethod
+    def _key_text(column, context):
+        return f"Column: {column}\n{context}"
+
+    def _embed(self, text):
+        vector = self.model.encode([text], normalize_embeddings=True)[0]
+        return np.asarray(vector, dtype='float32')
+
+    def _build_index(self):
+        # hnswlib gives an approximate index; without it we fall back to a brute-force scan
+        if hnswlib is None or self.vectors is None or not len(self.vectors):
+            self.index = None
+            return
+        self.index = hnswlib.Index(space='cosine', dim=self.vectors.shape[1])
+        self.index.init_index(max_elements=max(self.max_elements, len(self.vectors)), ef_construction=200, M=16)
+        self.index.add_items(self.vectors, list(range(len(self.vectors))))
+        self.index.set_ef(50)
+
+    def load(self):
+        """Load stored entries and vectors from the cache directory, if any."""
+        if not self.enabled:
+            return
+        try:
+            with open(self._entries_path(), 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+            self.vectors = np.load(self._vectors_path())
+        except FileNotFoundError:
+            self.entries = []
+            self.vectors = None
+        except Exception as e:
+            print(f"Error loading semantic cache: {e}")
+            self.entries = []
+            self.vectors = None
+        if self.vectors is not None and len(self.vectors) != len(self.entries):
+            print("Semantic cache files are out of sync, starting with an empty cache.")
+            self.entries = []
+            self.vectors = None
+        self._build_index()
+
+    def save(self):
+        """Write entries and vectors to the cache directory."""
+        if not self.enabled or self.vectors is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._entries_path(), 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False)
+            np.save(self._vectors_path(), self.vectors)
+        except Exception as e:
+            print(f"Error saving semantic cache: {e}")
+
+    def _nearest(self, vector):
+        count = len(self.entries)
+        k = min(self.neighbours, count)
+        if self.index is not None:
+            labels, distances = self.index.knn_query(vector, k=k)
+            return [(int(label), 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+        similarities = self.vectors @ vector
+        best = np.argsort(-similarities)[:k]
+        return [(int(i), float(similarities[i])) for i in best]
+
+    def lookup(self, column, context, audit=True):
+        """
+        Return a cached value for a near-duplicate (column, context), or None.
+
+        Args:
+          column: The missing column name.
+          context: The row context text used for the search query.
+          audit: Log the hit; dry runs pass False.
+        """
+        if not self.enabled or not self.entries or not context:
+            return None
+        vector = self._embed(self._key_text(column, context))
+        for position, similarity in self._nearest(vector):
+            entry = self.entries[position]
+            if entry['column'] != column or similarity < self.threshold:
+                continue
+            if audit:
+                self._audit(column, context, entry, similarity)
+            return entry['value']
+        return None
+
+    def add(self, column, context, value):
+        """Store an extraction result for later near-duplicate lookups."""
+        if not self.enabled or not context or not value:
+            return
+        vector = self._embed(self._key_text(column, context))
+        if self.vectors is None:
+            self.vectors = vector.reshape(1, -1)
+        else:
+            self.vectors = np.vstack([self.vectors, vector])
+        self.entries.append({'column': column, 'context': context, 'value': value})
+        if hnswlib is None:
+            return
+        if self.index is None:
+            self._build_index()
+        else:
+            if len(self.entries) > self.index.get_max_elements():
+                self.index.resize_index(len(self.entries) * 2)
+            self.index.add_items(vector.reshape(1, -1), [len(self.entries) - 1])
+
+    def _audit(self, column, context, entry, similarity):
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'column': column,
+            'similarity': round(similarity, 4),
+            'value': entry['value'],
+            'context': context,
+            'matched_context': entry['context'],
+        }
+        print(f"   Semantic cache hit for '{column}' (similarity {similarity:.3f})")
+        try:
+            os.makedirs(os.path.dirname(self.audit_log_path) or '.', exist_ok=True)
+            with open(self.audit_log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception as e:
+            print(f"Error writing semantic cache audit log: {e}")
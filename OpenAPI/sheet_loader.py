@@ -0,0 +1,38 @@
+import pandas as pd
+
+from cell_scheduler import row_weights
+from row_keys import row_identities
+
+# HubSpot export columns that are not analyzed
+COLUMNS_TO_EXCLUDE = ['Company owner', 'Civilty', 'Contact first name', 'Contact last name', 'Position', 'Comments', '(Hyperline) Assign a subscription link', '(Hyperline) Billing email', '(Hyperline) Create a new invoice link', '(Hyperline) Currency', '(Hyperline) Custom payment delay (in days)', '(Hyperline) Custom tax rate', '(Hyperline) Estimated ARR', '(Hyperline) External ID', '(Hyperline) ID', '(Hyperline) Invoice emails (comma separated)', '(Hyperline) Language', '(Hyperline) Next payment amount', '(Hyperline) Next payment date', '(Hyperline) Open invoices link', '(Hyperline) Open link', '(Hyperline) Open subscriptions link', '(Hyperline) Synchronize', '(Hyperline) Tax number', '(Hyperline) Timezone', 'About Us', 'Annual Revenue', 'Campaign of last booking in meetings tool', 'City', 'Clinic email', 'Close Date', 'Company Domain Name', 'Company Keywords', 'Company name', 'Company Type', 'Corporate group', 'Country/Region', 'Country/Region Code', 'Create Date', 'Created by user ID', 'Date of last meeting booked in meetings tool', 'Days to Close', 'Description', 'Employee range', 'Employees on LinkedIn', 'Existing CT?', 'Facebook Company Page', 'Facebook Fans', 'First Contact Create Date', 'First Conversion', 'First Conversion Date', 'First Deal Created Date', 'First Touch Converting Campaign', 'Founded on', 'Google Plus Page', 'Has been enriched', 'Has Org Chart', 'Headquarter', 'HubSpot Team', 'Ideal Customer Profile Tier', 'Industry', 'Industry group', 'Is Public', 'Last Activity Date', 'Last Booked Meeting Date', 'Last Contacted', 'Last Engagement Date', 'Last Logged Call Date', 'Last Modified Date', 'Last Open Task Date', 'Last Touch Converting Campaign', 'Latest Traffic Source', 'Latest Traffic Source Data 1', 'Latest Traffic Source Data 2', 'Latest Traffic Source Timestamp', 'Lead Status', 'LF MRI / HF MRI / CT Scan', 'Lifecycle Stage', 'LinkedIn Bio', 'LinkedIn Company Page', 'Linkedin handle', 'LinkedIn url', 'Logo URL', 'Medium of last booking in meetings tool', 'Merged Company IDs', 'MRI Field Strength 1', 'MRI Field Strength 2', 'MRI Manufacturer 1', 'MRI Manufacturer 2', 'MRI Model 1', 'MRI Model 2', 'MRI quantity', 'MRI Type', 'MRI?', 'Next Activity Date', 'Number of Associated Contacts', 'Number of Associated Deals', 'Number of blockers', 'Number of child companies', 'Number of Contacts on Org Chart', 'Number of contacts with a buying role', 'Number of decision makers', 'Number of Employees', 'Number of Form Submissions', 'Number of HubSpot Contacts on Org Chart', 'Number of open deals', 'Number of Pageviews', 'Number of Placeholder Contacts on Org Chart', 'Number of Sessions', 'Number of times contacted', 'Org Chart Last Updated At', 'Original Traffic Source', 'Original Traffic Source Drill-Down 1', 'Original Traffic Source Drill-Down 2', 'Owner assigned date', 'Ownership Type', 'PARENT ACCOUNT', 'Parent Company', 'Phone Number', 'Postal Code', 'Practice Type', 'Recent Conversion', 'Recent Conversion Date', 'Recent Deal Amount', 'Recent Deal Close Date', 'Record source', 'Record source detail 1', 'Record source detail 2', 'Record source detail 3', 'Revenue range', 'Size', 'Source of last booking in meetings tool', 'Specialities', 'State/Region', 'Street Address', 'Street Address 2', 'Sync ID', 'Tagline', 'Target Account', 'Time First Seen', 'Time Last Seen', 'Time of First Session', 'Time of Last Session', 'Time Zone', 'Total Money Raised', 'Total open deal value', 'Total Revenue', 'Twitter Bio', 'Twitter Followers', 'Twitter Handle', 'Type', 'Updated by user ID', 'VET/CRO/BIO/MED/Academia (Cloned)', 'Web Technologies', 'Website URL', 'Year Founded', 'Additional Domains']
+
+
+def load_excel_frame(input_path, row_priorities, columns_to_exclude=COLUMNS_TO_EXCLUDE):
+    """
+    Read an Excel file and keep only the columns to analyze.
+
+    Row weights and identity columns are read before the other columns
+    are dropped, since they come from excluded columns. The columns kept
+    are cast to object so that text can be filled into empty ones.
+
+    Returns:
+      A (df, weights, identities) tuple; weights and identities are keyed
+      by row index, as from row_weights and row_identities.
+    """
+    # Read the Excel file and ensure the first row is the header
+    df = pd.read_excel(input_path, header=0)
+
+    # Remove any formatting and special designs
+    df.columns = df.columns.str.strip()
+    df = df.apply(lambda column: column.map(lambda x: x.strip() if isinstance(x, str) else x))
+
+    # Row priorities and the company identity (domain, name, city) come from columns that are dropped below
+    weights = row_weights(df, row_priorities)
+    identities = row_identities(df)
+
+    # Drop columns that do not need to be analyzed
+    df = df.drop(columns=columns_to_exclude, errors='ignore')
+
+    # All-empty columns are read as float64, which does not take the text values filled in
+    df = df.astype(object)
+    return df, weights, identities
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from cell_scheduler import column_weight, schedule_cells
+from sheet_loader import load_excel_frame
+
+# Same shape as the weights and priorities configured in CRMauto.py
+COLUMN_WEIGHTS = {'phone': 10, 'email': 10, 'address': 8, 'postal': 5, 'zip': 5, 'city': 5, 'website': 5}
+ROW_PRIORITIES = {'Ideal Customer Profile Tier': {'Tier 1': 3, 'Tier 2': 2, 'Tier 3': 1}}
+
+
+class ScheduleLoadedFrameTest(unittest.TestCase):
+    """Schedule cells on a HubSpot-like sheet after load_excel_frame has dropped its columns."""
+
+    def setUp(self):
+        sheet = pd.DataFrame({
+            'Company name': ['Low Vet', 'High Vet', 'Mid Vet'],
+            'Company Domain Name': ['low.com', 'high.com', None],
+            'Phone Number': [None, None, None],
+            'Ideal Customer Profile Tier': ['Tier 3', 'Tier 1', 'Tier 2'],
+            ' MRI info ': [None, None, 'Yes'],
+            'Clinic Phone': [None, None, None],
+            'Main email': ['a@low.com', None, None],
+        })
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'companies.xlsx')
+        sheet.to_excel(self.path, index=False)
+        self.df, self.weights, self.identities = load_excel_frame(self.path, ROW_PRIORITIES)
+
+    def test_excluded_columns_are_dropped(self):
+        self.assertEqual(self.df.columns.tolist(), ['MRI info', 'Clinic Phone', 'Main email'])
+
+    def test_weights_and_identities_come_from_dropped_columns(self):
+        self.assertEqual(self.weights.tolist(), [1.0, 3.0, 2.0])
+        self.assertEqual(self.identities[1], {'Company name': 'High Vet', 'Company Domain Name': 'high.com'})
+        self.assertEqual(self.identities[2], {'Company name': 'Mid Vet'})
+
+    def test_empty_columns_take_text(self):
+        self.df.at[0, 'Clinic Phone'] = '+1 555 123 4567'
+        self.assertEqual(self.df.at[0, 'Clinic Phone'], '+1 555 123 4567')
+
+    def test_configured_weights_apply_to_surviving_columns(self):
+        weights = {column: column_weight(column, COLUMN_WEIGHTS) for column in self.df.columns}
+        self.assertEqual(weights, {'MRI info': 1.0, 'Clinic Phone': 10, 'Main email': 10})
+
+    def test_cells_ordered_by_column_and_row_weight(self):
+        cells = schedule_cells(self.df, COLUMN_WEIGHTS, weights=self.weights)
+        self.assertEqual(cells, [
+            (1, 'Clinic Phone'), (1, 'Main email'),
+            (2, 'Clinic Phone'), (2, 'Main email'),
+            (0, 'Clinic Phone'),
+            (1, 'MRI info'),
+            (0, 'MRI info'),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from entity_store import EntityStore, column_fact
+
+
+class ColumnFactTest(unittest.TestCase):
+    """Columns map to stored facts by whole keywords, not by pieces of other words."""
+
+    def test_columns_with_fact_keywords(self):
+        self.assertEqual(column_fact('Country/Region'), 'country')
+        self.assertEqual(column_fact('State/Region'), 'region')
+        self.assertEqual(column_fact('Phone Number'), 'phone')
+        self.assertEqual(column_fact('LinkedIn Company Page'), 'linkedin')
+        self.assertEqual(column_fact('Company Domain Name'), 'website')
+
+    def test_columns_only_containing_keywords(self):
+        for column in ('Kennel capacity', 'Real estate owner', 'Hotel phone policy', 'Facebook Fans'):
+            self.assertIsNone(column_fact(column), column)
+
+
+class LookupTest(unittest.TestCase):
+    """lookup skips stored values that do not fit the column's format."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = EntityStore(os.path.join(self.directory.name, 'facts.sqlite3'))
+        self.addCleanup(self.store.close)
+
+    def test_invalid_newest_value_is_skipped(self):
+        self.store.record_fact('vet.com', 'phone', '555-123-4567', 'https://vet.com/contact')
+        self.store.record_fact('vet.com', 'phone', 'Call us', 'https://vet.com/')
+        self.store.connection.commit()
+        self.assertEqual(self.store.lookup('vet.com', 'Phone Number'), '555-123-4567')
+
+    def test_no_valid_value(self):
+        self.store.record_fact('vet.com', 'email', 'info at vet.com', 'https://vet.com/')
+        self.store.connection.commit()
+        self.assertIsNone(self.store.lookup('vet.com', 'Main email'))
+
+
+if __name__ == "__main__":
+    unittest.main()